@@ -0,0 +1,327 @@
+"""Headless JSON API over the dashboard's aggregations.
+
+Run from the Dashboard directory:
+
+    python api_server.py --port 8600
+
+Every endpoint accepts the dashboard's filters as query parameters:
+``countries`` and ``types`` (comma separated, default all), ``year_start``
+and ``year_end``. ``/leadership``, ``/breakdown`` and ``/trends`` also take ``focus``, and
+``/profiles`` takes ``level`` (overall, country, country_type, year_country).
+Responses carry an ETag (304 on If-None-Match) and are gzipped when the
+client accepts it. ``/export`` streams the filtered rows as CSV, or with
+``format=xlsx`` a workbook that also has the summary sheets; ``table`` picks
+a summary table for CSV. ``/outliers`` pages on the server when given
+``page`` (with ``page_size``, ``sort``, ``descending`` and a ``q`` text
+filter). ``/pivot`` groups by ``dims`` (Country, Pesticide_Type, Period)
+and aggregates ``measures`` with ``aggs``; ``period`` sets the Period length
+in years, ``columns`` spreads one dimension across columns and ``engine``
+picks duckdb, polars or numpy. ``/validation`` lists the load-time
+data-quality flags for the selected countries and years.
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import traceback
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import export
+import paging
+import pivot
+import queries
+import summary
+import trends
+import validate
+from dataset import find_data_file
+from refresh import DatasetRef, BackgroundRefresher
+
+# Skip gzip for tiny bodies where the header overhead outweighs the saving
+GZIP_MIN_BYTES = 512
+
+
+def parse_filters(dataset, params):
+    """Dashboard filter state from query parameters (defaults: everything selected)"""
+    def as_list(name, default):
+        value = params.get(name, [""])[0]
+        return [v for v in value.split(",") if v] if value else default
+
+    data = dataset.data
+    countries = as_list("countries", sorted(data["Country"].unique()))
+    types = as_list("types", list(data["Pesticide_Type"].unique()))
+    year_range = (
+        int(params.get("year_start", [data["Year"].min()])[0]),
+        int(params.get("year_end", [data["Year"].max()])[0]),
+    )
+    return countries, types, year_range
+
+
+def regional_endpoint(dataset, filtered, countries, types, year_range, params):
+    return queries.to_records(queries.regional_trend(filtered))
+
+
+def country_comparison_endpoint(dataset, filtered, countries, types, year_range, params):
+    return queries.to_records(filtered.intensity)
+
+
+def overview_endpoint(dataset, filtered, countries, types, year_range, params):
+    avg_per_country, latest_per_country = queries.country_averages(filtered)
+    return {
+        "average": queries.to_records(avg_per_country.reset_index()),
+        "latest_year": year_range[1],
+        "latest": queries.to_records(latest_per_country.reset_index()),
+    }
+
+
+def decades_endpoint(dataset, filtered, countries, types, year_range, params):
+    avg_decade, pct_increase = queries.decade_averages(filtered)
+    return {"decades": queries.to_records(avg_decade), "pct_increase": pct_increase}
+
+
+def leadership_endpoint(dataset, filtered, countries, types, year_range, params):
+    focus = params.get("focus", ["South Africa"])[0]
+    result = queries.leadership(dataset.store, countries, focus, year_range)
+    return {
+        "focus_country": focus,
+        "regional": queries.to_records(result["regional"]),
+        "recent": queries.to_records(result["recent"].rename_axis("Country").reset_index()),
+        "focus": queries.to_records(result["focus"]),
+    }
+
+
+def breakdown_endpoint(dataset, filtered, countries, types, year_range, params):
+    return queries.to_records(queries.type_pivot(filtered).reset_index())
+
+
+def page_params(params):
+    """Paging arguments for PagedTable.page, or None when no ``page`` was asked for"""
+    if "page" not in params:
+        return None
+    page_size = int(params.get("page_size", [paging.DEFAULT_PAGE_SIZE])[0])
+    if not 1 <= page_size <= max(paging.PAGE_SIZES):
+        raise ValueError(f"page_size must be between 1 and {max(paging.PAGE_SIZES)}")
+    return {
+        "page": int(params["page"][0]),
+        "page_size": page_size,
+        "sort": params.get("sort", [None])[0],
+        "ascending": params.get("descending", ["false"])[0].lower() not in ("1", "true", "yes"),
+        "query": params.get("q", [""])[0],
+    }
+
+
+def outliers_endpoint(dataset, filtered, countries, types, year_range, params):
+    df, found, corr = queries.outliers(filtered)
+    result = {"correlation": None if corr != corr else corr, "count": len(found)}
+    paged = page_params(params)
+    if paged is None:
+        result["outliers"] = queries.to_records(found)
+        return result
+    # Sorted and filtered on the server; only the requested page is serialized
+    table = paging.paged_table("outliers", filtered, queries.outlier_rows)
+    rows, matching, n_pages = table.page(**paged)
+    result.update({
+        "outliers": queries.to_records(rows), "matching": matching, "pages": n_pages,
+        "page": min(max(paged["page"], 1), n_pages),
+    })
+    return result
+
+
+def profiles_endpoint(dataset, filtered, countries, types, year_range, params):
+    level = params.get("level", ["country"])[0]
+    if level not in summary.LEVELS:
+        raise ValueError(f"level must be one of {', '.join(summary.LEVELS)}")
+    return {"level": level, "profile": queries.to_records(summary.filtered_profiles(filtered)[level])}
+
+
+def trends_endpoint(dataset, filtered, countries, types, year_range, params):
+    focus = params.get("focus", ["South Africa"])[0]
+    fits = trends.fits_for(dataset, year_range)
+    metrics = fits.metrics
+    selected = metrics["Country"].isin(countries) & metrics["Series"].isin(list(types) + [trends.KG_PER_HA])
+    recent = dataset.store.recent_mean(countries, year_range[1])
+    return {
+        "focus_country": focus,
+        "series": queries.to_records(metrics[selected]),
+        "projection": queries.to_records(fits.project(focus)),
+        "insights": trends.insights(fits, focus, recent),
+    }
+
+
+def pivot_endpoint(dataset, filtered, countries, types, year_range, params):
+    def as_list(name, default):
+        value = params.get(name, [""])[0]
+        return [v for v in value.split(",") if v] if value else default
+
+    dims = as_list("dims", ["Country", "Period"])
+    column_dim = params.get("columns", [None])[0]
+    if column_dim is not None and column_dim not in dims:
+        raise ValueError("columns must be one of the dims")
+    result = pivot.run_query(
+        filtered, dims, as_list("measures", ["Tonnes"]), as_list("aggs", ["sum"]),
+        int(params.get("period", [5])[0]), params.get("engine", [None])[0],
+    )
+    table = result.wide(column_dim) if column_dim and not result.table.empty else result.table
+    return {"engine": result.engine, "skipped": result.skipped, "rows": queries.to_records(table)}
+
+
+def validation_endpoint(dataset, filtered, countries, types, year_range, params):
+    report = dataset.validation
+    return {
+        "dataset_hash": report.dataset_hash,
+        "checks": {name: {"description": text, "flagged": report.counts[name]} for name, text in validate.CHECKS.items()},
+        "issues": queries.to_records(report.for_selection(countries, year_range)),
+    }
+
+
+def filters_endpoint(dataset, filtered, countries, types, year_range, params):
+    data = dataset.data
+    return {
+        "countries": sorted(str(c) for c in data["Country"].unique()),
+        "types": [str(t) for t in data["Pesticide_Type"].unique()],
+        "year_min": int(data["Year"].min()),
+        "year_max": int(data["Year"].max()),
+        "version": dataset.version,
+    }
+
+
+# Streamed file downloads rather than JSON
+EXPORT_PATH = "/export"
+
+ENDPOINTS = {
+    "/filters": filters_endpoint,
+    "/regional": regional_endpoint,
+    "/country-comparison": country_comparison_endpoint,
+    "/overview": overview_endpoint,
+    "/decades": decades_endpoint,
+    "/leadership": leadership_endpoint,
+    "/breakdown": breakdown_endpoint,
+    "/outliers": outliers_endpoint,
+    "/profiles": profiles_endpoint,
+    "/trends": trends_endpoint,
+    "/pivot": pivot_endpoint,
+    "/validation": validation_endpoint,
+}
+
+
+class QueryHandler(BaseHTTPRequestHandler):
+    dataset_ref = None
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        path = url.path.rstrip("/") or "/filters"
+        endpoint = ENDPOINTS.get(path)
+        if endpoint is None and path != EXPORT_PATH:
+            self.send_json(404, {"error": f"Unknown endpoint {url.path}", "endpoints": sorted(ENDPOINTS) + [EXPORT_PATH]})
+            return
+
+        # One dataset version for the whole request, even if a refresh swaps it meanwhile
+        dataset = self.dataset_ref.current()
+        # The response is fully determined by the dataset version and the query. The tag is weak:
+        # gzipped and identity bodies share it, and If-None-Match compares weakly anyway
+        etag = 'W/"{}"'.format(hashlib.sha1(
+            f"{dataset.version}:{dataset.signature}:{url.path}?{url.query}".encode()
+        ).hexdigest())
+        client_tags = [t.strip().removeprefix("W/") for t in self.headers.get("If-None-Match", "").split(",")]
+        if etag.removeprefix("W/") in client_tags:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+
+        params = parse_qs(url.query)
+        try:
+            countries, types, year_range = parse_filters(dataset, params)
+        except ValueError as e:
+            self.send_json(400, {"error": f"Invalid filter: {e}"})
+            return
+        filtered = queries.apply_filters(dataset, countries, types, year_range)
+        if path == EXPORT_PATH:
+            self.send_export(filtered, params, etag)
+            return
+        try:
+            body = endpoint(dataset, filtered, countries, types, year_range, params)
+        except ValueError as e:
+            self.send_json(400, {"error": str(e)})
+            return
+        except Exception as e:
+            # Answer with a status instead of letting the handler drop the connection
+            self.log_error("%s failed: %s", url.path, traceback.format_exc())
+            self.send_json(500, {"error": f"Internal error: {type(e).__name__}: {e}"})
+            return
+        self.send_json(200, {"version": dataset.version, "data": body}, etag=etag)
+
+    def send_export(self, filtered, params, etag):
+        """Stream an export as it is generated; the body ends when the connection closes"""
+        fmt = params.get("format", ["csv"])[0]
+        table = params.get("table", [export.SHEETS[0]])[0]
+        if fmt not in ("csv", "xlsx") or table not in export.SHEETS:
+            self.send_json(400, {"error": "format must be csv or xlsx, table one of " + ", ".join(export.SHEETS)})
+            return
+        self.send_response(200)
+        if fmt == "xlsx":
+            self.send_header("Content-Type", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+            self.send_header("Content-Disposition", 'attachment; filename="pesticide_use.xlsx"')
+        else:
+            self.send_header("Content-Type", "text/csv; charset=utf-8")
+            self.send_header("Content-Disposition", f'attachment; filename="{table}.csv"')
+        self.send_header("ETag", etag)
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+
+        tables = export.export_tables(filtered)
+        if fmt == "xlsx":
+            export.write_xlsx(tables, self.wfile)
+            return
+        for name, columns, rows in tables:
+            if name == table:
+                export.write_csv(columns, rows, self.wfile)
+                return
+            # Summaries are accumulated while the data rows go by
+            for _ in rows:
+                pass
+
+    def send_json(self, status, payload, etag=None):
+        body = json.dumps(payload).encode("utf-8")
+        gzipped = "gzip" in self.headers.get("Accept-Encoding", "") and len(body) >= GZIP_MIN_BYTES
+        if gzipped:
+            body = gzip.compress(body)
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Vary", "Accept-Encoding")
+        if gzipped:
+            self.send_header("Content-Encoding", "gzip")
+        if etag:
+            self.send_header("ETag", etag)
+            self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="JSON query API for the pesticide dashboard data")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8600)
+    parser.add_argument("--source", default=None, help="CSV, SQLite database or pickle snapshot")
+    args = parser.parse_args()
+
+    source = args.source or find_data_file()
+    if source is None:
+        parser.error("Data file 'Pesticide_Cleaned_Data_v3.csv' not found; pass --source")
+    QueryHandler.dataset_ref = DatasetRef(source)
+    BackgroundRefresher(QueryHandler.dataset_ref).start()
+
+    server = ThreadingHTTPServer((args.host, args.port), QueryHandler)
+    print(f"Serving {source} on http://{args.host}:{args.port} ({', '.join(sorted(ENDPOINTS) + [EXPORT_PATH])})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+"""Render every dashboard section for a list of filter presets.
+
+Run from the Dashboard directory:
+
+    python batch_export.py report_presets.json --out reports --format both --workers 4
+
+Each preset is a JSON object with ``name`` and optional ``countries``,
+``types``, ``year_start``, ``year_end``, ``focus`` and ``pivot`` (defaults:
+everything selected, South Africa in focus, the Pivot Explorer's default
+query). Chart sections are drawn with the same chart functions as the
+dashboard and written as PNGs and/or one PDF per preset. The table sections,
+Summary Statistics and Pivot Explorer, are written as CSV files next to them
+and are not part of the PDF.
+
+A preset's ``pivot`` takes ``dims``, ``measures``, ``aggs``, ``period`` and
+``columns`` like the /pivot endpoint.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+from matplotlib.backends.backend_pdf import PdfPages
+
+import charts
+import pivot
+import queries
+import summary
+import trends
+from dataset import find_data_file
+from refresh import DatasetVersion, source_signature
+
+# The Pivot Explorer's default query
+DEFAULT_PIVOT = {"dims": ["Country", "Period"], "measures": ["Tonnes"], "aggs": ["sum"], "period": 5, "columns": None}
+
+# Loaded once in the parent; forked workers inherit it instead of reloading
+_DATASET = None
+
+
+def _init_worker(source):
+    global _DATASET
+    if _DATASET is None:
+        _DATASET = DatasetVersion(1, source, source_signature(source))
+
+
+def slugify(name):
+    return re.sub(r"[^A-Za-z0-9]+", "_", name).strip("_").lower() or "preset"
+
+
+def preset_filters(dataset, preset):
+    data = dataset.data
+    countries = preset.get("countries") or sorted(data["Country"].unique())
+    types = preset.get("types") or list(data["Pesticide_Type"].unique())
+    year_range = (
+        int(preset.get("year_start", data["Year"].min())),
+        int(preset.get("year_end", data["Year"].max())),
+    )
+    return countries, types, year_range
+
+
+def section_figures(dataset, preset):
+    """Yield (slug, figure) for every section, in dashboard order"""
+    countries, types, year_range = preset_filters(dataset, preset)
+    focus = preset.get("focus", "South Africa")
+    filtered = queries.apply_filters(dataset, countries, types, year_range)
+    if filtered.empty:
+        return
+
+    yield "01_regional_trends", charts.regional_trend_figure(queries.regional_trend(filtered))
+    avg_per_country, latest_per_country = queries.country_averages(filtered)
+    yield "02_overview", charts.overview_figure(avg_per_country, latest_per_country, year_range[1])
+    avg_decade, pct_increase = queries.decade_averages(filtered)
+    yield "03_by_decade", charts.decade_figure(avg_decade)
+    leadership = queries.leadership(dataset.store, countries, focus, year_range)
+    yield "04_leadership", charts.leadership_figure(
+        dataset.store, focus, types, year_range, leadership["regional"], leadership["recent"]
+    )
+    fits = trends.fits_for(dataset, year_range)
+    yield "04_leadership_projection", charts.projection_figure(
+        leadership["focus"], fits.trend_line(focus), fits.project(focus), focus
+    )
+    yield "05_country_comparison", charts.country_comparison_figure(filtered.intensity)
+    type_pivot = queries.type_pivot(filtered)
+    if not type_pivot.empty:
+        yield "06_pesticides_breakdown", charts.breakdown_figure(type_pivot)
+        yield "06_pesticides_composition", charts.composition_figure(type_pivot, focus)
+    df, outliers, correlation = queries.outliers(filtered)
+    yield "07_outliers", charts.outliers_figure(df, outliers)
+
+
+def section_tables(dataset, preset):
+    """Yield (slug, DataFrame) for the table sections, in dashboard order"""
+    countries, types, year_range = preset_filters(dataset, preset)
+    filtered = queries.apply_filters(dataset, countries, types, year_range)
+    if filtered.empty:
+        return
+
+    for level, table in summary.filtered_profiles(filtered).items():
+        yield f"08_summary_{level}", table
+    query = {**DEFAULT_PIVOT, **preset.get("pivot", {})}
+    result = pivot.run_query(filtered, query["dims"], query["measures"], query["aggs"], int(query["period"]))
+    if not result.table.empty:
+        yield "09_pivot", result.wide(query["columns"]) if query["columns"] else result.table
+
+
+def _save_plotly(fig, path_stem):
+    """PNG via kaleido when installed, otherwise HTML; returns the PNG path or None.
+
+    The HTML loads plotly.min.js from its own folder (copied there once per
+    preset), so the reports open offline.
+    """
+    try:
+        fig.write_image(path_stem + ".png", width=1200, height=500)
+        return path_stem + ".png"
+    except (ImportError, ValueError, RuntimeError):
+        fig.write_html(path_stem + ".html", include_plotlyjs="directory")
+        return None
+
+
+def export_preset(preset, out_dir, formats):
+    """Render one preset in a worker; returns (name, files written, figures, seconds)"""
+    start = time.perf_counter()
+    name = preset.get("name", "preset")
+    preset_dir = os.path.join(out_dir, slugify(name))
+    os.makedirs(preset_dir, exist_ok=True)
+    written = []
+    n_figures = 0
+
+    pdf = PdfPages(os.path.join(preset_dir, "report.pdf")) if "pdf" in formats else None
+    try:
+        for slug, fig in section_figures(_DATASET, preset):
+            n_figures += 1
+            stem = os.path.join(preset_dir, slug)
+            if hasattr(fig, "write_html"):
+                png = _save_plotly(fig, stem)
+                written.append(png or stem + ".html")
+                if pdf is not None and png is not None:
+                    # Plotly charts go into the PDF as their rendered PNG
+                    page, ax = plt.subplots(figsize=(12, 5))
+                    ax.imshow(plt.imread(png))
+                    ax.axis("off")
+                    pdf.savefig(page)
+                    plt.close(page)
+                if "png" not in formats and png is not None:
+                    os.remove(png)
+                    written.remove(png)
+                continue
+            fig.suptitle(name, fontsize=10, x=0.01, ha="left")
+            if "png" in formats:
+                fig.savefig(stem + ".png", dpi=100, bbox_inches="tight")
+                written.append(stem + ".png")
+            if pdf is not None:
+                pdf.savefig(fig, bbox_inches="tight")
+            plt.close(fig)
+        for slug, table in section_tables(_DATASET, preset):
+            path = os.path.join(preset_dir, slug + ".csv")
+            table.to_csv(path, index=False)
+            written.append(path)
+    finally:
+        if pdf is not None:
+            pdf.close()
+            written.append(os.path.join(preset_dir, "report.pdf"))
+    return name, written, n_figures, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export every dashboard section for a list of filter presets")
+    parser.add_argument("presets", help="JSON file with a list of filter presets")
+    parser.add_argument("--out", default="reports", help="Output directory")
+    parser.add_argument("--format", choices=["png", "pdf", "both"], default="both")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--source", default=None, help="CSV, SQLite database or pickle snapshot")
+    args = parser.parse_args()
+
+    with open(args.presets) as f:
+        presets = json.load(f)
+    source = args.source or find_data_file()
+    if source is None:
+        parser.error("Data file 'Pesticide_Cleaned_Data_v3.csv' not found; pass --source")
+    formats = {"png", "pdf"} if args.format == "both" else {args.format}
+
+    start = time.perf_counter()
+    # Build the dataset and its aggregates once; with fork the workers share these pages
+    _init_worker(source)
+    validation = _DATASET.validation
+    if not validation.ok:
+        print(f"Warning: {len(validation.bad_partitions)} country-years failed data checks "
+              f"(run validate.py for details): {validation.counts}")
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context("fork" if "fork" in methods else None)
+
+    total_figures = 0
+    with ProcessPoolExecutor(max_workers=args.workers, mp_context=context,
+                             initializer=_init_worker, initargs=(source,)) as pool:
+        futures = [pool.submit(export_preset, preset, args.out, formats) for preset in presets]
+        for future in as_completed(futures):
+            name, written, n_figures, seconds = future.result()
+            total_figures += n_figures
+            print(f"  {name}: {n_figures} figures, {len(written)} files in {seconds:.1f}s")
+
+    elapsed = time.perf_counter() - start
+    print(
+        f"Exported {len(presets)} presets / {total_figures} figures in {elapsed:.1f}s "
+        f"({total_figures / elapsed:.1f} figures/s, {len(presets) / elapsed:.2f} presets/s) to {args.out}"
+    )
+
+
+if __name__ == "__main__":
+    main()
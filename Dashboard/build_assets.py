@@ -0,0 +1,112 @@
+"""Build the dashboard's static assets into static/.
+
+Run from the Dashboard directory after editing assets/dashboard.css:
+
+    python build_assets.py
+    python build_assets.py --font path/to/fa-solid-900.woff2   # re-subset the icons
+
+Writes static/dashboard.min.css (the minified dashboard styles plus the icon
+rules) and static/fa-solid-subset.woff2. That file holds only the Font Awesome
+Free solid glyphs listed in ICONS. Re-subsetting needs fontTools with brotli
+(pip install fonttools brotli) and the fa-solid-900.woff2 file from a Font
+Awesome Free 6.x download. Without --font, the committed subset is reused.
+"""
+import argparse
+import hashlib
+import os
+import re
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SOURCE_CSS = os.path.join(HERE, "assets", "dashboard.css")
+STATIC_DIR = os.path.join(HERE, "static")
+CSS_NAME = "dashboard.min.css"
+FONT_NAME = "fa-solid-subset.woff2"
+
+# Icons used by the sidebar: class name -> Font Awesome codepoint
+ICONS = {
+    "bullseye": 0xF140,
+    "calendar-alt": 0xF073,
+    "compass": 0xF14E,
+    "download": 0xF019,
+    "filter": 0xF0B0,
+    "flask": 0xF0C3,
+    "globe-africa": 0xF57C,
+}
+
+LICENSE_BANNER = (
+    "/*! Font Awesome Free 6.4.0 subset by @fontawesome - https://fontawesome.com "
+    "License - https://fontawesome.com/license/free (Icons: CC BY 4.0, Fonts: SIL OFL 1.1) */"
+)
+
+
+def subset_font(source, target):
+    from fontTools import subset
+
+    options = subset.Options()
+    options.flavor = "woff2"
+    options.layout_features = []
+    options.name_IDs = ["*"]
+    options.notdef_outline = True
+    font = subset.load_font(source, options)
+    subsetter = subset.Subsetter(options)
+    subsetter.populate(unicodes=ICONS.values())
+    subsetter.subset(font)
+    subset.save_font(font, target, options)
+
+
+def icon_css(font_version):
+    """@font-face for the subset plus the .fas / .fa-* rules the sidebar markup uses"""
+    rules = [
+        "@font-face {font-family: 'Font Awesome 6 Free'; font-style: normal; font-weight: 900; "
+        f"font-display: block; src: url({FONT_NAME}?v={font_version}) format('woff2');}}",
+        ".fas {font-family: 'Font Awesome 6 Free'; font-weight: 900; font-style: normal; "
+        "font-variant: normal; display: inline-block; line-height: 1; text-rendering: auto; "
+        "-moz-osx-font-smoothing: grayscale; -webkit-font-smoothing: antialiased;}",
+    ]
+    rules += [f'.fa-{name}::before {{content: "\\{code:x}";}}' for name, code in sorted(ICONS.items())]
+    return "\n".join(rules)
+
+
+def minify_css(css):
+    """Drop comments and collapse whitespace; good enough for hand-written CSS"""
+    css = re.sub(r"/\*(?!!).*?\*/", "", css, flags=re.S)
+    css = re.sub(r"\s+", " ", css)
+    css = re.sub(r"\s*([{}:;,>])\s*", r"\1", css)
+    css = re.sub(r"\s*!important", "!important", css)
+    css = css.replace(";}", "}")
+    return css.strip()
+
+
+def content_hash(data):
+    return hashlib.sha1(data).hexdigest()[:12]
+
+
+def build(font_source=None):
+    os.makedirs(STATIC_DIR, exist_ok=True)
+    font_path = os.path.join(STATIC_DIR, FONT_NAME)
+    if font_source:
+        subset_font(font_source, font_path)
+    if not os.path.exists(font_path):
+        raise SystemExit(f"{font_path} is missing; pass --font path/to/fa-solid-900.woff2")
+    with open(font_path, "rb") as f:
+        font_version = content_hash(f.read())
+
+    with open(SOURCE_CSS) as f:
+        css = f.read()
+    minified = LICENSE_BANNER + "\n" + minify_css(icon_css(font_version) + "\n" + css) + "\n"
+    with open(os.path.join(STATIC_DIR, CSS_NAME), "w") as f:
+        f.write(minified)
+    return len(css), len(minified), os.path.getsize(font_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Minify the dashboard CSS and subset the icon font")
+    parser.add_argument("--font", help="Font Awesome Free fa-solid-900.woff2 to subset")
+    args = parser.parse_args()
+    source_bytes, css_bytes, font_bytes = build(args.font)
+    print(f"{CSS_NAME}: {source_bytes:,} -> {css_bytes:,} bytes; {FONT_NAME}: {font_bytes:,} bytes "
+          f"({len(ICONS)} icons)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,248 @@
+import matplotlib.pyplot as plt
+import pandas as pd
+import plotly.express as px
+import seaborn as sns
+
+from queries import TOTAL_TYPE
+
+country_colors = {
+    "South Africa": "#1f77b4",
+    "Zimbabwe": "#ff7f0e",
+    "Zambia": "#2ca02c",
+    "Mozambique": "#d62728",
+    "Namibia": "#9467bd",
+    "Botswana": "#8c564b",
+    "Lesotho": "#e377c2",
+    "Eswatini": "#7f7f7f",
+    "Angola": "#bcbd22",
+    "Malawi": "#17becf",
+}
+
+
+def short_name(country):
+    return "SA" if country == "South Africa" else country
+
+
+def regional_trend_figure(regional):
+    fig = px.line(
+        regional, x="Year", y="Kg_per_ha",
+        title="Average Pesticide Intensity (kg/ha)",
+        height=500
+    )
+    fig.update_layout(title_font_size=20, xaxis_title_font_size=14, yaxis_title_font_size=14)
+    return fig
+
+
+def country_comparison_figure(intensity):
+    fig = px.line(
+        intensity,
+        x="Year",
+        y="Kg_per_ha",
+        color="Country",
+        title="Pesticide Use Trends",
+        labels={"Kg_per_ha": "Pesticide Use (kg/ha)", "Year": "Year"},
+        color_discrete_map=country_colors,
+        height=500
+    )
+    fig.update_layout(
+        hovermode="x unified",
+        legend=dict(yanchor="top", y=0.99, xanchor="left", x=0.01),
+        title_font_size=20, xaxis_title_font_size=14, yaxis_title_font_size=14, legend_title_font_size=12
+    )
+    fig.update_traces(line=dict(width=2))
+    return fig
+
+
+def overview_figure(avg_per_country, latest_per_country, latest_year):
+    fig3, (ax1, ax2) = plt.subplots(1, 2, figsize=(21, 8))
+
+    ax1.barh(
+        avg_per_country.index,
+        avg_per_country.values,
+        color=[country_colors.get(c, "#666666") for c in avg_per_country.index]
+    )
+    ax1.set_xlabel("Average Pesticide Use (kg/ha)", fontsize=14)
+    ax1.set_ylabel("Country", fontsize=14)
+    ax1.set_title("Average Pesticide Use Intensity by Country", fontsize=16, fontweight="bold")
+    ax1.tick_params(axis='x', labelsize=12)
+    ax1.tick_params(axis='y', labelsize=12)
+    ax1.grid(axis="x", alpha=0.3)
+    for i, (country_name, value) in enumerate(avg_per_country.items()):
+        ax1.text(value + 0.05, i, f"{value:.2f}", va="center", fontsize=12)
+
+    ax2.barh(
+        latest_per_country.index,
+        latest_per_country.values,
+        color=[country_colors.get(c, "#666666") for c in latest_per_country.index]
+    )
+    ax2.set_xlabel("Pesticide Use (kg/ha)", fontsize=14)
+    ax2.set_ylabel("Country", fontsize=14)
+    ax2.set_title(f"Pesticide Use Intensity in {latest_year}", fontsize=16, fontweight="bold")
+    ax2.tick_params(axis='x', labelsize=12)
+    ax2.tick_params(axis='y', labelsize=12)
+    ax2.grid(axis="x", alpha=0.3)
+    for i, (country_name, value) in enumerate(latest_per_country.items()):
+        ax2.text(value + 0.05, i, f"{value:.2f}", va="center", fontsize=12)
+
+    fig3.tight_layout()
+    return fig3
+
+
+def decade_figure(avg_decade):
+    fig4, ax = plt.subplots(figsize=(8, 6))
+    sns.barplot(x="Decade", y="Avg_Kg_per_ha", data=avg_decade, palette="Set2", ax=ax)
+    for index, row in avg_decade.iterrows():
+        ax.text(index, row.Avg_Kg_per_ha/2, f"{row.Avg_Kg_per_ha:.2f}", ha="center", va="center", color="white", fontweight="bold", fontsize=12)
+    ax.set_title("Average Pesticide Use per Hectare by Decade", fontsize=16, fontweight="bold")
+    ax.set_ylabel("Avg Kg per Ha", fontsize=14)
+    ax.set_xlabel("Decade", fontsize=14)
+    ax.tick_params(axis='x', labelsize=12)
+    ax.tick_params(axis='y', labelsize=12)
+    return fig4
+
+
+def leadership_figure(store, focus_country, types, year_range, regional_avg, recent_avg):
+    focus_series = store.country_frame(focus_country, year_range)
+    focus_short = short_name(focus_country)
+
+    fig, axes = plt.subplots(2,2,figsize=(16,10))
+
+    # 1. Focus country vs Regional Average
+    ax1 = axes[0,0]
+    ax1.plot(focus_series["Year"], focus_series["Kg_per_ha"], label=focus_country, linestyle="-", linewidth=2.5)
+    ax1.plot(regional_avg["Year"], regional_avg["Kg_per_ha"], label="Regional Average", linestyle="--", linewidth=1.5)
+    ax1.set_xlabel("Year", fontsize=14)
+    ax1.set_ylabel("Kg per Ha", fontsize=14)
+    ax1.set_title(f"{focus_country} vs Regional Average", fontsize=16, fontweight="bold")
+    ax1.tick_params(axis='x', labelsize=12)
+    ax1.tick_params(axis='y', labelsize=12)
+    ax1.legend(fontsize=10)
+    ax1.grid(alpha=0.3)
+
+    # 2. YoY Change (precomputed for every country in the time-series store)
+    ax2 = axes[0,1]
+    yoy = focus_series.iloc[1:]
+    colors = ["green" if x>0 else "red" for x in yoy["YoY_Change"]]
+    ax2.bar(yoy["Year"], yoy["YoY_Change"], color=colors)
+    ax2.set_xlabel("Year", fontsize=14)
+    ax2.set_ylabel("Year-over-Year Change (%)", fontsize=14)
+    ax2.set_title(f"{focus_short}: Annual Growth Rate", fontsize=16, fontweight="bold")
+    ax2.axhline(0, color="black", linewidth=0.5)
+    ax2.tick_params(axis='x', labelsize=12)
+    ax2.tick_params(axis='y', labelsize=12)
+    ax2.grid(axis="y", alpha=0.3)
+
+    # 3. Focus country pesticide types evolution
+    ax3 = axes[1,0]
+    focus_idx = store.country_index(focus_country)
+    years = store.year_slice(year_range)
+    for ptype in types:
+        type_idx = store.type_index(ptype)
+        if ptype == TOTAL_TYPE or type_idx is None or focus_idx is None:
+            continue
+        ax3.plot(store.years[years], store.tonnes[focus_idx, type_idx, years], label=ptype, marker="o", markersize=3)
+    ax3.set_xlabel("Year", fontsize=14)
+    ax3.set_ylabel("Tonnes", fontsize=14)
+    ax3.set_title(f"{focus_short}: Pesticide Types Evolution", fontsize=16, fontweight="bold")
+    ax3.tick_params(axis='x', labelsize=12)
+    ax3.tick_params(axis='y', labelsize=12)
+    ax3.legend(fontsize=10)
+    ax3.grid(alpha=0.3)
+
+    # 4. Comparison with neighboring countries
+    ax4 = axes[1,1]
+    recent_avg = recent_avg.sort_values()
+    colors_bar = ["#FF6B6B" if c==focus_country else "#4ECDC4" for c in recent_avg.index]
+    ax4.barh(recent_avg.index, recent_avg.values, color=colors_bar)
+    ax4.set_xlabel("Average Kg per Ha", fontsize=14)
+    ax4.set_title("Recent Performance (Last 5 Years)", fontsize=16, fontweight="bold")
+    ax4.tick_params(axis='x', labelsize=12)
+    ax4.tick_params(axis='y', labelsize=12)
+    ax4.grid(axis="x", alpha=0.3)
+    for i,(country,value) in enumerate(recent_avg.items()):
+        ax4.text(value+0.05, i, f"{value:.2f}", va="center", fontsize=12)
+
+    fig.tight_layout()
+    return fig
+
+
+MODEL_LABELS = {"linear": "Linear trend", "log_linear": "Exponential trend", "piecewise": "Piecewise trend"}
+
+
+def projection_figure(focus_series, trend_line, projection, focus_country):
+    fig, ax = plt.subplots(figsize=(12, 4.5))
+    ax.plot(focus_series["Year"], focus_series["Kg_per_ha"], label=focus_country, linewidth=2.5)
+    if not trend_line.empty:
+        ax.plot(trend_line["Year"], trend_line["Trend"], linestyle="--", linewidth=1.5,
+                label=MODEL_LABELS.get(trend_line["Model"].iloc[0], "Trend"))
+    if not projection.empty:
+        ax.plot(projection["Year"], projection["Projection"], linestyle=":", marker="o", color="#FF6B6B", label="Projection")
+        ax.fill_between(projection["Year"].astype(float), projection["Lower"].astype(float),
+                        projection["Upper"].astype(float), color="#FF6B6B", alpha=0.2, label="90% range")
+    ax.set_xlabel("Year", fontsize=14)
+    ax.set_ylabel("Kg per Ha", fontsize=14)
+    ax.set_title(f"{focus_country}: Trend and Projection", fontsize=16, fontweight="bold")
+    ax.tick_params(axis='x', labelsize=12)
+    ax.tick_params(axis='y', labelsize=12)
+    ax.legend(fontsize=10)
+    ax.grid(alpha=0.3)
+    fig.tight_layout()
+    return fig
+
+
+def breakdown_figure(type_pivot):
+    fig6, (ax1, ax2) = plt.subplots(1, 2, figsize=(20, 6), constrained_layout=True)
+
+    type_pivot.plot(kind='bar', stacked=True, ax=ax1, color=plt.cm.Set2.colors[:type_pivot.shape[1]])
+    ax1.set_xlabel('Country', fontsize=14)
+    ax1.set_ylabel('Average Pesticide Use (tonnes)', fontsize=14)
+    ax1.set_title('Average Pesticide Use by Type (1990–2023)', fontsize=16, fontweight='bold')
+    ax1.tick_params(axis='x', labelsize=12)
+    ax1.tick_params(axis='y', labelsize=12)
+    ax1.legend(title='Pesticide Type', bbox_to_anchor=(1.05,1), loc='best', fontsize=14)
+    ax1.grid(axis='y', alpha=0.3)
+    plt.setp(ax1.xaxis.get_majorticklabels(), rotation=45, ha='right', fontsize=12)
+
+    type_pivot_pct = type_pivot.div(type_pivot.sum(axis=1), axis=0) * 100
+    type_pivot_pct.plot(kind='bar', stacked=True, ax=ax2, color=plt.cm.Set2.colors[:type_pivot.shape[1]])
+    ax2.set_xlabel('Country', fontsize=14)
+    ax2.set_ylabel('Percentage (%)', fontsize=14)
+    ax2.set_title('Pesticide Type Composition by Country', fontsize=16, fontweight='bold')
+    ax2.tick_params(axis='x', labelsize=12)
+    ax2.tick_params(axis='y', labelsize=12)
+    ax2.legend(title='Pesticide Type', bbox_to_anchor=(1.05,1), loc='upper left', fontsize=10)
+    ax2.grid(axis='y', alpha=0.3)
+    plt.setp(ax2.xaxis.get_majorticklabels(), rotation=45, ha='right', fontsize=14)
+    return fig6
+
+
+def composition_figure(type_pivot, focus_country):
+    fig7, axes = plt.subplots(1, 2, figsize=(14,6))
+
+    # Focus country Pie
+    focus_data = type_pivot.loc[focus_country] if focus_country in type_pivot.index else pd.Series()
+    if not focus_data.empty:
+        axes[0].pie(focus_data, labels=focus_data.index, autopct='%1.1f%%', startangle=90, textprops={'fontsize':12})
+        axes[0].set_title(f"{focus_country} Pesticide Composition", fontsize=14, fontweight='bold')
+    else:
+        axes[0].text(0.5,0.5,f"No data for {focus_country}", ha='center', va='center', fontsize=12)
+
+    # Global Pie
+    global_data = type_pivot.mean(axis=0)
+    axes[1].pie(global_data, labels=global_data.index, autopct='%1.1f%%', startangle=90, textprops={'fontsize':12})
+    axes[1].set_title("Global Pesticide Composition (Selected Countries)", fontsize=14, fontweight='bold')
+    return fig7
+
+
+def outliers_figure(df, outliers):
+    fig8, ax = plt.subplots(figsize=(10,6))
+    sns.scatterplot(x="Tonnes", y="Kg_per_ha", hue="Pesticide_Type", hue_order=list(df["Pesticide_Type"].unique()), data=df, palette="Set2", ax=ax)
+    ax.scatter(outliers["Tonnes"], outliers["Kg_per_ha"], color="red", label="Outliers", s=60, edgecolor="black")
+    ax.set_title("Tonnes vs Kg per Hectare with Outliers Highlighted", fontsize=16, fontweight='bold')
+    ax.set_xlabel("Tonnes", fontsize=14)
+    ax.set_ylabel("Kg per Ha", fontsize=14)
+    ax.tick_params(axis='x', labelsize=12)
+    ax.tick_params(axis='y', labelsize=12)
+    ax.legend(fontsize=10)
+    ax.grid(alpha=0.3)
+    return fig8
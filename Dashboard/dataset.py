@@ -0,0 +1,101 @@
+import os
+import sqlite3
+
+import pandas as pd
+
+# Table written by the notebook's database step
+SQLITE_TABLE = "Pesticide_Uses"
+
+DATA_FILENAME = "Pesticide_Cleaned_Data_v3.csv"
+
+# Columns holding repeated labels, stored as dictionary-encoded categoricals
+CATEGORICAL_COLUMNS = ["Country", "Pesticide_Type"]
+
+
+def memory_usage(df):
+    """Deep memory usage of a DataFrame in bytes"""
+    return int(df.memory_usage(deep=True).sum())
+
+
+def compact_frame(df):
+    """Return a compact copy of the cleaned dataset.
+
+    Columns with a single value (indicator names and units) are dropped and
+    kept in ``attrs["constants"]``, Country and Pesticide_Type become
+    categoricals and Year is downcast. Memory before and after is recorded in
+    ``attrs["memory"]``.
+    """
+    before = memory_usage(df)
+    constants = {
+        col: df[col].iloc[0]
+        for col in df.columns
+        if col not in CATEGORICAL_COLUMNS
+        and not pd.api.types.is_numeric_dtype(df[col])
+        and df[col].nunique(dropna=False) == 1
+    }
+    compact = df.drop(columns=list(constants))
+    for col in CATEGORICAL_COLUMNS:
+        compact[col] = compact[col].astype("category")
+    compact["Year"] = pd.to_numeric(compact["Year"], downcast="integer")
+
+    compact.attrs["constants"] = constants
+    compact.attrs["memory"] = {"before": before, "after": memory_usage(compact)}
+    return compact
+
+
+def load_compact(path):
+    """Read the cleaned CSV straight into the compact representation"""
+    return compact_frame(pd.read_csv(path))
+
+
+def format_bytes(n):
+    for unit in ["B", "KB", "MB", "GB"]:
+        if n < 1024 or unit == "GB":
+            return f"{n:.0f} {unit}" if unit == "B" else f"{n:.1f} {unit}"
+        n /= 1024
+
+
+def intensity_table(df):
+    """(Country, Year) -> Kg_per_ha, one row per country-year.
+
+    Kg_per_ha is a country-year value that the merged CSV repeats for every
+    Pesticide_Type, so aggregating it over the merged rows double counts.
+    """
+    table = df[["Country", "Year", "Kg_per_ha"]].drop_duplicates(["Country", "Year"])
+    return table.sort_values(["Country", "Year"]).reset_index(drop=True)
+
+
+def tonnage_table(df):
+    """(Country, Pesticide_Type, Year) -> Tonnes fact table"""
+    table = df[["Country", "Pesticide_Type", "Year", "Tonnes"]]
+    return table.sort_values(["Country", "Pesticide_Type", "Year"]).reset_index(drop=True)
+
+
+def load_source(path):
+    """Load the cleaned dataset from a CSV, a SQLite database or a pickle snapshot"""
+    ext = os.path.splitext(path)[1].lower()
+    if ext in (".db", ".sqlite", ".sqlite3"):
+        with sqlite3.connect(path) as conn:
+            df = pd.read_sql_query(f"SELECT * FROM {SQLITE_TABLE};", conn)
+    elif ext in (".pkl", ".pickle"):
+        df = pd.read_pickle(path)
+    else:
+        df = pd.read_csv(path)
+    return compact_frame(df)
+
+
+def default_data_paths():
+    """Candidate data locations, an explicit PESTICIDE_DATA_SOURCE first"""
+    paths = [
+        DATA_FILENAME,  # Current directory (local development)
+        "Dashboard/" + DATA_FILENAME,  # From repository root (Streamlit Cloud)
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), DATA_FILENAME),  # Next to this module
+    ]
+    if os.environ.get("PESTICIDE_DATA_SOURCE"):
+        paths.insert(0, os.environ["PESTICIDE_DATA_SOURCE"])
+    return paths
+
+
+def find_data_file():
+    """First existing data location, or None"""
+    return next((path for path in default_data_paths() if os.path.exists(path)), None)
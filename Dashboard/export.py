@@ -0,0 +1,327 @@
+"""Streaming CSV and XLSX export of a filter state and its summaries.
+
+Run from the Dashboard directory:
+
+    python export.py --format xlsx --out pesticides.xlsx --countries "Zambia,Malawi" --year-start 2000
+
+Writes the same three tables as the notebook's Excel step: Merged_Data (the
+filtered rows), Summary_Per_Country and Summary_Per_Type. Rows are read from
+the shared dataset in fixed-size chunks and written out as they go. The
+summaries are accumulated during that same pass, so memory does not grow
+with the size of the export. That holds for the CLI and the API's /export;
+the dashboard's download buttons need the finished file in memory (see
+export_bytes). ``--format csv`` writes one CSV per table.
+XLSX files are written with the standard library (inline strings, no shared
+string table), so neither openpyxl nor xlsxwriter is needed.
+"""
+import argparse
+import csv
+import io
+import os
+import zipfile
+from xml.sax.saxutils import escape
+
+import numpy as np
+import pandas as pd
+
+import queries
+from dataset import find_data_file
+from refresh import DatasetVersion, source_signature
+
+# Rows materialized from the shared dataset at a time
+CHUNK_ROWS = 2000
+
+DATA_COLUMNS = ["Country", "Pesticide_Type", "Year", "Tonnes", "Kg_per_ha"]
+
+# (column, statistics) per summary, as in the notebook's summary tables
+COUNTRY_STATS = [("Kg_per_ha", ["count", "mean", "std", "min", "max"]), ("Tonnes", ["mean", "std", "min", "max"])]
+TYPE_STATS = [("Kg_per_ha", ["mean", "std", "min", "max"]), ("Tonnes", ["mean", "std", "min", "max"])]
+
+SHEETS = ["Merged_Data", "Summary_Per_Country", "Summary_Per_Type"]
+
+
+def iter_chunks(filtered, chunk_rows=CHUNK_ROWS):
+    """Filtered rows of the shared dataset as a sequence of small frames"""
+    data = filtered.dataset.data
+    rows = filtered.data_rows
+    for start in range(0, len(rows), chunk_rows):
+        yield data.take(rows[start:start + chunk_rows])[DATA_COLUMNS]
+
+
+def _merge_moments(a, b):
+    """Combine two per-group (count, mean, M2, min, max) frames (Chan et al.'s parallel update)"""
+    a, b = a.align(b, join="outer")
+    na, nb = a["count"].fillna(0), b["count"].fillna(0)
+    ma, mb = a["mean"].fillna(0), b["mean"].fillna(0)
+    n = na + nb
+    delta = mb - ma
+    with np.errstate(invalid="ignore", divide="ignore"):
+        weight = (nb / n).fillna(0)
+    return pd.concat({
+        "count": n,
+        "mean": ma + delta * weight,
+        "m2": a["m2"].fillna(0) + b["m2"].fillna(0) + delta ** 2 * na * weight,
+        "min": np.fmin(a["min"], b["min"]),
+        "max": np.fmax(a["max"], b["max"]),
+    }, axis=1)
+
+
+class SummaryAccumulator:
+    """Grouped count/mean/std/min/max of Kg_per_ha and Tonnes, fed one chunk at a time.
+
+    Each chunk is reduced to per-group count, mean and M2 (sum of squared
+    deviations from the mean) and merged into the running totals. Unlike sums
+    of squares, this does not cancel on tonnage-sized values.
+    """
+
+    def __init__(self, keys, stats):
+        self.keys = keys
+        self.stats = stats
+        self.parts = None
+
+    def add(self, chunk):
+        grouped = chunk[self.keys + ["Kg_per_ha", "Tonnes"]].groupby(self.keys, observed=True)
+        count = grouped.count()
+        part = pd.concat({
+            "count": count,
+            "mean": grouped.mean(),
+            "m2": grouped.var(ddof=0).fillna(0) * count,
+            "min": grouped.min(),
+            "max": grouped.max(),
+        }, axis=1)
+        # Only one row per group is kept between chunks
+        self.parts = part if self.parts is None else _merge_moments(self.parts, part)
+
+    def result(self):
+        """Summary table with one row per group and ``<column>_<stat>`` columns, rounded like the notebook"""
+        if self.parts is None:
+            return pd.DataFrame(columns=self.keys + [f"{col}_{stat}" for col, names in self.stats for stat in names])
+        p = self.parts.sort_index()
+        out = {}
+        for col, names in self.stats:
+            n = p[("count", col)]
+            with np.errstate(invalid="ignore", divide="ignore"):
+                std = np.sqrt(p[("m2", col)] / (n - 1))
+            computed = {
+                "count": n.astype(np.int64),
+                "mean": p[("mean", col)].where(n > 0),
+                "std": std.where(n > 1),
+                "min": p[("min", col)],
+                "max": p[("max", col)],
+            }
+            for stat in names:
+                out[f"{col}_{stat}"] = computed[stat]
+        return pd.DataFrame(out).round(2).reset_index()
+
+
+def _records(df):
+    return df.itertuples(index=False, name=None)
+
+
+def export_tables(filtered):
+    """Yield (sheet name, columns, row iterator); summary rows are ready once the data rows are consumed"""
+    by_country = SummaryAccumulator(["Country"], COUNTRY_STATS)
+    by_type = SummaryAccumulator(["Country", "Pesticide_Type"], TYPE_STATS)
+
+    def data_rows():
+        for chunk in iter_chunks(filtered):
+            by_country.add(chunk)
+            by_type.add(chunk)
+            yield from _records(chunk.astype({"Country": str, "Pesticide_Type": str}))
+
+    yield SHEETS[0], DATA_COLUMNS, data_rows()
+    for name, acc in ((SHEETS[1], by_country), (SHEETS[2], by_type)):
+        table = acc.result()
+        yield name, list(table.columns), _records(table)
+
+
+def export_bytes(filtered, fmt):
+    """Whole export as bytes, for callers that need it in one piece (e.g. st.download_button).
+
+    CSV is the Merged_Data table; XLSX has all three sheets. The file is held
+    in memory, so this path is not bounded like the CLI and /export, which
+    write as they go.
+    """
+    buffer = io.BytesIO()
+    if fmt == "xlsx":
+        write_xlsx(export_tables(filtered), buffer)
+    else:
+        name, columns, rows = next(export_tables(filtered))
+        write_csv(columns, rows, buffer)
+    return buffer.getvalue()
+
+
+# --- CSV ---
+
+def iter_csv(columns, rows, chunk_rows=CHUNK_ROWS):
+    """CSV text in chunks of chunk_rows lines"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(columns)
+    for i, row in enumerate(rows, 1):
+        writer.writerow(["" if v is None or v != v else v for v in row])
+        if i % chunk_rows == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def write_csv(columns, rows, out):
+    """Stream one table to a binary file object as UTF-8 CSV"""
+    for text in iter_csv(columns, rows):
+        out.write(text.encode("utf-8"))
+
+
+# --- XLSX ---
+
+_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/styles.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+    '{sheets}</Types>'
+)
+_SHEET_CONTENT_TYPE = (
+    '<Override PartName="/xl/worksheets/sheet{n}.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+)
+_ROOT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="xl/workbook.xml"/></Relationships>'
+)
+_WORKBOOK = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<sheets>{sheets}</sheets></workbook>'
+)
+_WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '{sheets}<Relationship Id="rIdStyles" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" '
+    'Target="styles.xml"/></Relationships>'
+)
+_STYLES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    '<fonts count="2"><font><sz val="11"/><name val="Calibri"/></font>'
+    '<font><b/><sz val="11"/><name val="Calibri"/></font></fonts>'
+    '<fills count="2"><fill><patternFill patternType="none"/></fill>'
+    '<fill><patternFill patternType="gray125"/></fill></fills>'
+    '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+    '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+    '<cellXfs count="2"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+    '<xf numFmtId="0" fontId="1" fillId="0" borderId="0" xfId="0" applyFont="1"/></cellXfs>'
+    '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+    '</styleSheet>'
+)
+
+
+def _xlsx_cell(value, style=""):
+    if isinstance(value, np.generic):
+        value = value.item()
+    if value is None or (isinstance(value, float) and value != value):
+        return "<c/>"
+    if isinstance(value, bool):
+        return f'<c t="b"{style}><v>{int(value)}</v></c>'
+    if isinstance(value, (int, float)):
+        return f"<c{style}><v>{value!r}</v></c>"
+    return f'<c t="inlineStr"{style}><is><t>{escape(str(value))}</t></is></c>'
+
+
+def _xlsx_sheet_rows(columns, rows, chunk_rows=CHUNK_ROWS):
+    """Worksheet XML in chunks; the header row is bold"""
+    parts = [
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+        '<sheetViews><sheetView workbookViewId="0"><pane ySplit="1" topLeftCell="A2" state="frozen"/>'
+        '</sheetView></sheetViews><sheetData>',
+        "<row>" + "".join(_xlsx_cell(c, ' s="1"') for c in columns) + "</row>",
+    ]
+    for i, row in enumerate(rows, 1):
+        parts.append("<row>" + "".join(_xlsx_cell(v) for v in row) + "</row>")
+        if i % chunk_rows == 0:
+            yield "".join(parts)
+            parts = []
+    parts.append("</sheetData></worksheet>")
+    yield "".join(parts)
+
+
+def write_xlsx(tables, out):
+    """Stream (name, columns, rows) tables into an XLSX workbook on a binary file object.
+
+    Each worksheet is compressed into the zip as it is generated. ``out`` does
+    not need to be seekable, so it can be an HTTP response body.
+    """
+    names = []
+    with zipfile.ZipFile(out, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        for n, (name, columns, rows) in enumerate(tables, 1):
+            names.append(name)
+            with zf.open(f"xl/worksheets/sheet{n}.xml", "w", force_zip64=True) as sheet:
+                for text in _xlsx_sheet_rows(columns, rows):
+                    sheet.write(text.encode("utf-8"))
+        sheet_ids = range(1, len(names) + 1)
+        zf.writestr("[Content_Types].xml", _CONTENT_TYPES.format(
+            sheets="".join(_SHEET_CONTENT_TYPE.format(n=n) for n in sheet_ids)))
+        zf.writestr("_rels/.rels", _ROOT_RELS)
+        zf.writestr("xl/workbook.xml", _WORKBOOK.format(sheets="".join(
+            f'<sheet name="{escape(name)}" sheetId="{n}" r:id="rId{n}"/>' for n, name in zip(sheet_ids, names))))
+        zf.writestr("xl/_rels/workbook.xml.rels", _WORKBOOK_RELS.format(sheets="".join(
+            f'<Relationship Id="rId{n}" '
+            'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+            f'Target="worksheets/sheet{n}.xml"/>' for n in sheet_ids)))
+        zf.writestr("xl/styles.xml", _STYLES)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export filtered data and summaries as CSV or XLSX")
+    parser.add_argument("--format", choices=["csv", "xlsx"], default="xlsx")
+    parser.add_argument("--out", help="XLSX file, or directory for the CSV files (default: current directory)")
+    parser.add_argument("--countries", help="Comma-separated countries (default: all)")
+    parser.add_argument("--types", help="Comma-separated pesticide types (default: all)")
+    parser.add_argument("--year-start", type=int)
+    parser.add_argument("--year-end", type=int)
+    parser.add_argument("--source", default=None, help="CSV, SQLite database or pickle snapshot")
+    args = parser.parse_args()
+
+    source = args.source or find_data_file()
+    if source is None:
+        parser.error("Data file 'Pesticide_Cleaned_Data_v3.csv' not found; pass --source")
+    dataset = DatasetVersion(1, source, source_signature(source))
+    data = dataset.data
+    countries = args.countries.split(",") if args.countries else sorted(data["Country"].unique())
+    types = args.types.split(",") if args.types else list(data["Pesticide_Type"].unique())
+    year_range = (
+        args.year_start if args.year_start is not None else int(data["Year"].min()),
+        args.year_end if args.year_end is not None else int(data["Year"].max()),
+    )
+    filtered = queries.apply_filters(dataset, countries, types, year_range)
+
+    if args.format == "xlsx":
+        path = args.out or "Pesticide_Export.xlsx"
+        with open(path, "wb") as f:
+            write_xlsx(export_tables(filtered), f)
+        written = [path]
+    else:
+        out_dir = args.out or "."
+        os.makedirs(out_dir, exist_ok=True)
+        written = []
+        for name, columns, rows in export_tables(filtered):
+            path = os.path.join(out_dir, f"{name}.csv")
+            with open(path, "wb") as f:
+                write_csv(columns, rows, f)
+            written.append(path)
+    print(f"Exported {len(filtered.data_rows):,} rows to {', '.join(written)}")
+
+
+if __name__ == "__main__":
+    main()
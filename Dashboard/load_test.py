@@ -0,0 +1,224 @@
+"""Concurrent-session load test for the dashboard.
+
+Run from the Dashboard directory:
+
+    python load_test.py --sessions 1,4,8,16 --actions 20
+
+Each simulated session drives Pesticide_Use_Dashboard.py headlessly with
+Streamlit's AppTest and plays a randomized interaction trace: Prev/Next
+navigation buttons, section and focus-country changes, country and type
+multiselect edits and year-slider drags. The Streamlit server runs every
+session as a thread in one process, so the sessions for one session count
+run as threads in a fresh subprocess. That subprocess reports latency
+percentiles, CPU time and peak RSS for that level.
+
+Two limits, also printed under the results:
+
+- AppTest.run() always executes the whole script. In a browser, most of
+  these interactions rerun only a fragment (the dashboard view or one
+  section), so the latencies are full-rerun figures: an upper bound on what
+  a real session waits for, not a measurement of it.
+- Peak RSS is the process-wide ru_maxrss of the subprocess, shared by all
+  its sessions and the loaded dataset. The per-session column is the growth
+  above the RSS before any session started, divided by the session count;
+  it is an estimate, since threads share the allocator and caches.
+"""
+import argparse
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import threading
+import time
+
+import numpy as np
+
+DASHBOARD = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Pesticide_Use_Dashboard.py")
+
+
+# --- Interaction trace ---
+
+def _widget(widgets, label):
+    return next(w for w in widgets if w.label == label)
+
+
+def click_navigation(at, rng):
+    buttons = [b for b in at.button if b.key and b.key.startswith(("prev_", "next_"))]
+    if not buttons:
+        return select_section(at, rng)
+    rng.choice(buttons).click()
+    return ["navigate"]
+
+
+def select_section(at, rng):
+    selector = at.selectbox(key="section_selector")
+    selector.set_value(rng.choice(selector.options))
+    return ["select_section"]
+
+
+def change_countries(at, rng):
+    countries = _widget(at.multiselect, "Select countries to display")
+    countries.set_value(rng.sample(countries.options, rng.randint(2, len(countries.options))))
+    return ["countries"]
+
+
+def change_types(at, rng):
+    types = _widget(at.multiselect, "Select Pesticide Types")
+    types.set_value(rng.sample(types.options, rng.randint(1, len(types.options))))
+    return ["types"]
+
+
+def change_focus(at, rng):
+    focus = at.selectbox(key="focus_country")
+    focus.set_value(rng.choice(focus.options))
+    return ["focus"]
+
+
+def drag_year_slider(at, rng):
+    """A drag emits several successive values; each one is a separate rerun"""
+    slider = _widget(at.slider, "Select Year Range")
+    start, end = slider.value
+    moving_start = rng.random() < 0.5
+    origin = start if moving_start else end
+    target = rng.randint(slider.min, end) if moving_start else rng.randint(start, slider.max)
+    # Up to four intermediate positions between the handle and its target
+    values = sorted({int(v) for v in np.linspace(origin, target, 5)[1:]}, reverse=target < origin) or [target]
+    steps = []
+    for value in values:
+        new_range = (value, end) if moving_start else (start, value)
+        steps.append(lambda r=new_range: slider.set_value(r))
+    return [("slider", steps)]
+
+
+# Weighted like real usage: navigation is the most common interaction
+ACTIONS = [
+    (click_navigation, 5),
+    (select_section, 2),
+    (change_countries, 2),
+    (change_types, 1),
+    (change_focus, 1),
+    (drag_year_slider, 2),
+]
+
+
+def run_session(seed, n_actions, latencies, errors):
+    from streamlit.testing.v1 import AppTest
+
+    rng = random.Random(seed)
+    at = AppTest.from_file(DASHBOARD, default_timeout=300)
+
+    def timed_run(kind):
+        t = time.perf_counter()
+        at.run()
+        latencies.append((kind, time.perf_counter() - t))
+        if at.exception:
+            errors.append(f"{kind}: {at.exception[0].message}")
+
+    timed_run("initial_load")
+    funcs, weights = zip(*ACTIONS)
+    for _ in range(n_actions):
+        action = rng.choices(funcs, weights)[0]
+        for step in action(at, rng):
+            if isinstance(step, tuple):
+                kind, setters = step
+                for set_value in setters:
+                    set_value()
+                    timed_run(kind)
+            else:
+                timed_run(step)
+
+
+def _peak_rss_mb():
+    """Process-wide peak RSS so far (ru_maxrss is KiB on Linux and bytes on macOS)"""
+    rss_scale = 1 if sys.platform == "darwin" else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * rss_scale / 2**20
+
+
+def run_level(n_sessions, n_actions, seed):
+    """Run n_sessions concurrent sessions in this process and return the measurements"""
+    latencies, errors = [], []
+    threads = [
+        threading.Thread(target=run_session, args=(seed + i, n_actions, latencies, errors))
+        for i in range(n_sessions)
+    ]
+    # Import Streamlit first so its footprint is not counted as session memory
+    import streamlit.testing.v1  # noqa: F401
+    rss_start = _peak_rss_mb()
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - wall_start
+    cpu = time.process_time() - cpu_start
+
+    values = np.array([seconds for kind, seconds in latencies]) * 1000
+    by_kind = {}
+    for kind, seconds in latencies:
+        by_kind.setdefault(kind, []).append(seconds * 1000)
+    peak_rss = _peak_rss_mb()
+    return {
+        "sessions": n_sessions,
+        "interactions": len(values),
+        "p50_ms": float(np.percentile(values, 50)),
+        "p90_ms": float(np.percentile(values, 90)),
+        "p99_ms": float(np.percentile(values, 99)),
+        "max_ms": float(values.max()),
+        "wall_s": wall,
+        "cpu_s": cpu,
+        "peak_rss_mb": peak_rss,
+        "rss_per_session_mb": (peak_rss - rss_start) / n_sessions,
+        "p50_by_kind_ms": {k: float(np.median(v)) for k, v in by_kind.items()},
+        "errors": errors[:10],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the dashboard with concurrent simulated sessions")
+    parser.add_argument("--sessions", default="1,2,4,8", help="Comma-separated session counts")
+    parser.add_argument("--actions", type=int, default=20, help="Interactions per session")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="Also write the results to this file")
+    parser.add_argument("--level", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.level is not None:
+        # Child process: one session count, results as JSON on stdout
+        print(json.dumps(run_level(args.level, args.actions, args.seed)))
+        return
+
+    results = []
+    print(f"{'sessions':>8} {'reruns':>7} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} {'max ms':>8} "
+          f"{'reruns/s':>9} {'CPU s':>7} {'CPU %':>6} {'peak RSS MB':>12} {'MB/session':>11}")
+    for n in [int(s) for s in args.sessions.split(",")]:
+        out = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--level", str(n),
+             "--actions", str(args.actions), "--seed", str(args.seed)],
+            capture_output=True, text=True, cwd=os.path.dirname(DASHBOARD),
+        )
+        if out.returncode != 0:
+            print(f"{n:>8} failed:\n{out.stderr[-2000:]}")
+            continue
+        r = json.loads(out.stdout.strip().splitlines()[-1])
+        results.append(r)
+        print(f"{r['sessions']:>8} {r['interactions']:>7} {r['p50_ms']:>8.0f} {r['p90_ms']:>8.0f} "
+              f"{r['p99_ms']:>8.0f} {r['max_ms']:>8.0f} {r['interactions'] / r['wall_s']:>9.1f} "
+              f"{r['cpu_s']:>7.1f} {100 * r['cpu_s'] / r['wall_s']:>6.0f} {r['peak_rss_mb']:>12.0f} "
+              f"{r['rss_per_session_mb']:>11.1f}")
+        for error in r["errors"]:
+            print(f"{'':>8} error: {error}")
+
+    print("\nLatencies are full-script reruns (AppTest cannot rerun just a fragment), an upper bound on")
+    print("what a browser session waits for. Peak RSS is process-wide; MB/session is the growth above the")
+    print("pre-session RSS divided by the session count, an estimate.")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""Server-side paging, sorting and text filtering of result tables.
+
+A section hands over its full result once per filter state. Pages are then
+cut out of it with ``take``, so a table widget (or an API response) only
+ships the rows on screen. Sort orders, filter matches and page slices are
+cached on the table, and tables are cached per filter state.
+"""
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_PAGE_SIZE = 50
+PAGE_SIZES = [25, 50, 100, 250]
+
+# Filter states and, per table, sort/filter views and pages kept at once
+MAX_TABLES = 32
+MAX_VIEWS = 16
+MAX_PAGES = 64
+
+
+def _remember(cache, key, value, limit):
+    cache[key] = value
+    cache.move_to_end(key)
+    while len(cache) > limit:
+        cache.popitem(last=False)
+    return value
+
+
+class PagedTable:
+    """One result frame with cached sort orders, filter matches and page slices"""
+
+    def __init__(self, frame):
+        self.frame = frame
+        self.columns = [str(c) for c in frame.columns]
+        self._orders = {}
+        self._text = {}
+        self._views = OrderedDict()
+        self._pages = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.frame)
+
+    def _order(self, column, ascending):
+        """Row positions sorted by one column, missing values last (stable, so ties keep row order)"""
+        key = (column, ascending)
+        if key not in self._orders:
+            values = self.frame[column].reset_index(drop=True)
+            if isinstance(values.dtype, pd.CategoricalDtype):
+                values = values.astype(str)
+            order = values.sort_values(ascending=ascending, kind="stable", na_position="last").index.to_numpy()
+            self._orders[key] = order
+        return self._orders[key]
+
+    def _matches(self, query):
+        """Rows where any column's text contains the query, case-insensitive"""
+        mask = np.zeros(len(self.frame), dtype=bool)
+        for column in self.frame.columns:
+            if column not in self._text:
+                self._text[column] = self.frame[column].astype(str).str.lower().reset_index(drop=True)
+            mask |= self._text[column].str.contains(query, regex=False).to_numpy()
+        return mask
+
+    def view(self, sort=None, ascending=True, query=""):
+        """Row positions for a sort column and filter text; cached per combination"""
+        query = query.strip().lower()
+        key = (sort, ascending, query)
+        with self._lock:
+            if key in self._views:
+                self._views.move_to_end(key)
+                return self._views[key]
+            positions = self._order(sort, ascending) if sort in self.frame.columns else np.arange(len(self.frame))
+            if query:
+                positions = positions[self._matches(query)[positions]]
+            return _remember(self._views, key, positions, MAX_VIEWS)
+
+    def page(self, page=1, page_size=DEFAULT_PAGE_SIZE, sort=None, ascending=True, query=""):
+        """(rows on the page, rows matching the filter, number of pages); ``page`` is 1-based and clamped"""
+        positions = self.view(sort, ascending, query)
+        n_pages = max(1, -(-len(positions) // page_size))
+        page = min(max(int(page), 1), n_pages)
+        key = (sort, ascending, query.strip().lower(), page, page_size)
+        with self._lock:
+            if key in self._pages:
+                self._pages.move_to_end(key)
+                rows = self._pages[key]
+            else:
+                start = (page - 1) * page_size
+                rows = _remember(self._pages, key, self.frame.take(positions[start:start + page_size]), MAX_PAGES)
+        return rows, len(positions), n_pages
+
+
+# (table name, filter state) -> PagedTable, shared by every session and request
+_tables = OrderedDict()
+_tables_lock = threading.Lock()
+
+
+def state_key(filtered):
+    """Hashable identity of a filter state, including the dataset version it reads"""
+    dataset = filtered.dataset
+    return (dataset.path, dataset.version, dataset.signature,
+            tuple(filtered.countries), tuple(filtered.types), filtered.year_range)
+
+
+def paged_table(name, filtered, build):
+    """PagedTable of ``build(filtered)``, built once per filter state"""
+    key = (name, state_key(filtered))
+    with _tables_lock:
+        if key in _tables:
+            _tables.move_to_end(key)
+            return _tables[key]
+    table = PagedTable(build(filtered))
+    with _tables_lock:
+        return _remember(_tables, key, _tables.get(key, table), MAX_TABLES)
@@ -0,0 +1,233 @@
+"""Ad-hoc pivot queries: group-by dimensions x measures x aggregations.
+
+A query runs on an embedded columnar engine over the filtered rows: DuckDB,
+which requirements.txt installs, then Polars. When neither imports, the
+single-sort numpy engine from summary.py is used; tests/test_pivot.py
+checks every installed engine against it. Each query builds one fact frame
+holding only the columns it needs and runs one vectorized group-by over it.
+Results are cached per (dataset version, filter state, query).
+
+Set PESTICIDE_PIVOT_ENGINE to duckdb, polars or numpy to pin an engine.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+import summary
+from paging import state_key
+from queries import TOTAL_TYPE
+
+# Dimensions users can group by; Period is Year bucketed by the query's width
+DIMENSIONS = ["Country", "Pesticide_Type", "Period"]
+
+# Measure -> table it is defined on (see summary.METRICS)
+MEASURES = summary.METRICS
+
+# Aggregation -> (summary.group_stats name, DuckDB SQL function, Polars expression method)
+AGGREGATIONS = {
+    "sum": ("sum", "sum", "sum"),
+    "mean": ("mean", "avg", "mean"),
+    "median": ("median", "median", "median"),
+    "min": ("min", "min", "min"),
+    "max": ("max", "max", "max"),
+    "std": ("std", "stddev_samp", "std"),
+    "count": ("count", "count", "count"),
+}
+
+# Period widths in years: 1 groups by single years
+PERIOD_WIDTHS = [1, 5, 10]
+
+ENGINES = ["duckdb", "polars", "numpy"]
+
+# Query results kept at once, across filter states and dataset versions
+MAX_RESULTS = 64
+
+
+@lru_cache(maxsize=None)
+def _installed(engine):
+    if engine == "numpy":
+        return True
+    try:
+        __import__(engine)
+    except ImportError:
+        return False
+    return True
+
+
+def available_engines():
+    return [engine for engine in ENGINES if _installed(engine)]
+
+
+def default_engine():
+    """PESTICIDE_PIVOT_ENGINE when installed, otherwise the first installed engine"""
+    pinned = os.environ.get("PESTICIDE_PIVOT_ENGINE", "").lower()
+    return pinned if pinned in ENGINES and _installed(pinned) else available_engines()[0]
+
+
+def period_codes(years, width):
+    """Categorical of '1990' (single years) or '1990-1994' labels; labels sort in time order"""
+    starts, codes = np.unique(years - years % width, return_inverse=True)
+    labels = [str(start) if width == 1 else f"{start}-{start + width - 1}" for start in starts]
+    return pd.Categorical.from_codes(codes, labels)
+
+
+def _labels(column, rows):
+    """Categorical of a label column at row positions, reusing its dictionary encoding"""
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        return pd.Categorical.from_codes(column.cat.codes.to_numpy()[rows], column.cat.categories.astype(str))
+    return pd.Categorical(column.to_numpy()[rows].astype(str))
+
+
+def fact_frame(filtered, measure, dims, period_width):
+    """Rows of the measure's table for a filter state, with just the query's columns"""
+    dataset = filtered.dataset
+    if MEASURES[measure] == "intensity":
+        table, rows = dataset.intensity, filtered.intensity_rows
+    else:
+        table, rows = dataset.tonnage, filtered.tonnage_rows
+        # Total rows would double count any aggregation across types
+        rows = rows[(table["Pesticide_Type"] != TOTAL_TYPE).to_numpy()[rows]]
+    columns = {}
+    for dim in dims:
+        if dim == "Period":
+            columns[dim] = period_codes(table["Year"].to_numpy(dtype=np.int64)[rows], period_width)
+        else:
+            columns[dim] = _labels(table[dim], rows)
+    columns[measure] = table[measure].to_numpy(dtype=float)[rows]
+    return pd.DataFrame(columns)
+
+
+def _run_numpy(frame, dims, measure, aggs):
+    """One lexsort + bincount pass for every aggregation (summary.profile)"""
+    stats = summary.profile(frame, dims, measure)
+    return stats[dims + [f"{measure}_{AGGREGATIONS[agg][0]}" for agg in aggs]].rename(
+        columns={f"{measure}_{AGGREGATIONS[agg][0]}": f"{measure}_{agg}" for agg in aggs}
+    )
+
+
+def _run_duckdb(frame, dims, measure, aggs):
+    import duckdb
+
+    select = [f'"{dim}"' for dim in dims] + [
+        f'{AGGREGATIONS[agg][1]}("{measure}") AS "{measure}_{agg}"' for agg in aggs
+    ]
+    sql = f"SELECT {', '.join(select)} FROM facts"
+    if dims:
+        group = ", ".join(f'"{dim}"' for dim in dims)
+        sql += f" GROUP BY {group} ORDER BY {group}"
+    # A private in-memory connection per query: safe across threads, scans the frame in place
+    # (categorical dimensions arrive as ENUMs, so nothing is converted to strings)
+    with duckdb.connect() as conn:
+        conn.register("facts", frame)
+        return conn.execute(sql).df()
+
+
+def _run_polars(frame, dims, measure, aggs):
+    import polars as pl
+
+    facts = pl.from_pandas(frame)
+    exprs = [getattr(pl.col(measure), AGGREGATIONS[agg][2])().alias(f"{measure}_{agg}") for agg in aggs]
+    result = facts.group_by(dims).agg(exprs).sort(dims) if dims else facts.select(exprs)
+    return result.to_pandas()
+
+
+RUNNERS = {"duckdb": _run_duckdb, "polars": _run_polars, "numpy": _run_numpy}
+
+
+def _merge(frames, dims):
+    merged = frames[0]
+    for frame in frames[1:]:
+        merged = merged.merge(frame, on=dims, how="outer") if dims else pd.concat([merged, frame], axis=1)
+    return merged
+
+
+class PivotResult:
+    """Long-format result of one query plus how it was produced"""
+
+    def __init__(self, table, dims, value_columns, skipped, engine, seconds):
+        self.table = table
+        self.dims = dims
+        self.value_columns = value_columns
+        # Measures left out because they are not defined for a chosen dimension
+        self.skipped = skipped
+        self.engine = engine
+        self.seconds = seconds
+
+    def wide(self, column_dim):
+        """The result with one dimension spread across columns (``<dim value> <value column>`` headers)"""
+        index = [dim for dim in self.dims if dim != column_dim]
+        wide = self.table.set_index(self.dims)[self.value_columns].unstack(column_dim)
+        if not index:
+            # Unstacking the only dimension leaves a Series; make it the single row
+            wide = wide.to_frame().T
+        if len(self.value_columns) == 1:
+            wide.columns = [str(c) for c in wide.columns.get_level_values(1)]
+        else:
+            wide.columns = [f"{c} {v}" for v, c in wide.columns]
+        return wide.reset_index() if index else wide.reset_index(drop=True)
+
+
+# (dataset version, filter state, query) -> PivotResult; keyed by version id so old versions are not kept alive
+_results = OrderedDict()
+_results_lock = threading.Lock()
+
+
+def run_query(filtered, dims, measures, aggs, period_width=5, engine=None):
+    """Group the filtered rows by ``dims`` and aggregate each measure with each of ``aggs``"""
+    dims, measures, aggs = tuple(dims), tuple(measures), tuple(aggs)
+    unknown = [d for d in dims if d not in DIMENSIONS] + [m for m in measures if m not in MEASURES] \
+        + [a for a in aggs if a not in AGGREGATIONS]
+    if unknown or not measures or not aggs or len(set(dims)) != len(dims):
+        raise ValueError(
+            f"dims must be distinct values from {', '.join(DIMENSIONS)}, measures from {', '.join(MEASURES)} "
+            f"and aggs from {', '.join(AGGREGATIONS)} (unknown: {', '.join(unknown) or 'none'})"
+        )
+    if period_width not in PERIOD_WIDTHS:
+        raise ValueError(f"period width must be one of {', '.join(map(str, PERIOD_WIDTHS))}")
+    engine = engine or default_engine()
+    if engine not in available_engines():
+        raise ValueError(f"engine must be one of {', '.join(available_engines())}")
+    key = (state_key(filtered), dims, measures, aggs, int(period_width), engine)
+    with _results_lock:
+        if key in _results:
+            _results.move_to_end(key)
+            return _results[key]
+    result = _run(filtered, list(dims), measures, aggs, int(period_width), engine)
+    with _results_lock:
+        _results[key] = result
+        while len(_results) > MAX_RESULTS:
+            _results.popitem(last=False)
+    return result
+
+
+def _run(filtered, dims, measures, aggs, period_width, engine):
+    start = time.perf_counter()
+    dataset = filtered.dataset
+    frames, value_columns, skipped = [], [], []
+    for measure in measures:
+        table = dataset.intensity if MEASURES[measure] == "intensity" else dataset.tonnage
+        if any(dim != "Period" and dim not in table.columns for dim in dims):
+            skipped.append(measure)
+            continue
+        frame = fact_frame(filtered, measure, dims, period_width)
+        if frame.empty:
+            continue
+        result = RUNNERS[engine](frame, dims, measure, list(aggs))
+        if dims:
+            # Engines return labels as categoricals, objects or strings; compare them as strings
+            result[dims] = result[dims].astype(str)
+        frames.append(result)
+        value_columns += [f"{measure}_{agg}" for agg in aggs]
+    if frames:
+        table = _merge(frames, dims)
+        table = table.sort_values(dims).reset_index(drop=True) if dims else table
+        count_columns = [c for c in value_columns if c.endswith("_count")]
+        table[count_columns] = table[count_columns].fillna(0).astype(np.int64)
+    else:
+        table = pd.DataFrame(columns=dims + value_columns)
+    return PivotResult(table, dims, value_columns, skipped, engine, time.perf_counter() - start)
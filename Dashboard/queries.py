@@ -0,0 +1,194 @@
+from functools import cached_property
+
+import numpy as np
+import pandas as pd
+
+TOTAL_TYPE = "Pesticides (total)"
+
+
+def _row_positions(table, countries, year_range, types=None, exclude_type=None):
+    """Positions of the rows of a shared table that match a filter state"""
+    years = table["Year"].to_numpy()
+    mask = table["Country"].isin(countries).to_numpy() & (years >= year_range[0]) & (years <= year_range[1])
+    if types is not None:
+        mask &= table["Pesticide_Type"].isin(types).to_numpy()
+    if exclude_type is not None:
+        mask &= (table["Pesticide_Type"] != exclude_type).to_numpy()
+    return np.flatnonzero(mask)
+
+
+def _take(table, positions):
+    """Rows at positions; the shared table itself when every row matches"""
+    return table if len(positions) == len(table) else table.take(positions)
+
+
+class FilteredData:
+    """One filter state over a shared, read-only DatasetVersion.
+
+    Holds positions into the dataset's tables and its time-series store rather
+    than filtered copies. The aggregations below read the store through these
+    positions; ``data``, ``intensity`` and ``tonnage`` are only built when a
+    section needs the rows themselves (a row-level chart or table).
+    """
+
+    def __init__(self, dataset, countries, types, year_range):
+        self.dataset = dataset
+        self.countries = list(countries)
+        self.types = list(types)
+        self.year_range = (int(year_range[0]), int(year_range[1]))
+        self.selected = bool(self.countries and self.types)
+        store = dataset.store
+        # Positions along the store's country / type / year axes
+        self.country_idx = store.country_indices(self.countries if self.selected else [])
+        type_idx = [store.type_index(t) for t in self.types]
+        self.type_idx = np.array(sorted(i for i in type_idx if i is not None), dtype=int)
+        self.years = store.year_slice(self.year_range)
+
+    @cached_property
+    def data_rows(self):
+        if not self.selected:
+            return np.array([], dtype=int)
+        return _row_positions(self.dataset.data, self.countries, self.year_range, types=self.types)
+
+    @property
+    def empty(self):
+        return len(self.data_rows) == 0
+
+    @cached_property
+    def data(self):
+        return _take(self.dataset.data, self.data_rows)
+
+    @cached_property
+    def intensity_rows(self):
+        if not self.selected:
+            return np.array([], dtype=int)
+        return _row_positions(self.dataset.intensity, self.countries, self.year_range)
+
+    @cached_property
+    def tonnage_rows(self):
+        if not self.selected:
+            return np.array([], dtype=int)
+        return _row_positions(self.dataset.tonnage, self.countries, self.year_range, types=self.types)
+
+    @cached_property
+    def intensity(self):
+        return _take(self.dataset.intensity, self.intensity_rows)
+
+    @cached_property
+    def tonnage(self):
+        return _take(self.dataset.tonnage, self.tonnage_rows)
+
+    def kg_per_ha_block(self):
+        """Kg_per_ha as [selected country, selected year]; NaN where a country-year is missing"""
+        return self.dataset.store.kg_per_ha[self.country_idx, self.years]
+
+
+def apply_filters(dataset, countries, types, year_range):
+    """Filter state over a DatasetVersion (no countries or types selected gives an empty one)"""
+    return FilteredData(dataset, countries, types, year_range)
+
+
+def _nanmean(values, axis=None):
+    """Mean ignoring NaNs; NaN (without a warning) where nothing is left"""
+    valid = ~np.isnan(values)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(valid, values, 0.0).sum(axis=axis) / valid.sum(axis=axis)
+
+
+def regional_trend(filtered):
+    """Average Kg_per_ha across countries for each year"""
+    store = filtered.dataset.store
+    values = _nanmean(filtered.kg_per_ha_block(), axis=0)
+    return pd.DataFrame({"Year": store.years[filtered.years], "Kg_per_ha": values}).dropna().reset_index(drop=True)
+
+
+def country_averages(filtered):
+    """Average Kg_per_ha per country, and the value in the last selected year"""
+    store = filtered.dataset.store
+    countries = pd.Index(store.countries[filtered.country_idx], name="Country")
+    avg_per_country = pd.Series(_nanmean(filtered.kg_per_ha_block(), axis=1), index=countries, name="Kg_per_ha")
+    latest = store.year_slice((filtered.year_range[1], filtered.year_range[1]))
+    latest_values = store.kg_per_ha[filtered.country_idx, latest.start] if latest.stop > latest.start else np.nan
+    latest_per_country = pd.Series(latest_values, index=countries, name="Kg_per_ha", dtype=float)
+    return avg_per_country.dropna().sort_values(), latest_per_country.dropna().sort_values()
+
+
+def get_decade(year):
+    if 1990 <= year <= 1999: return "1990s"
+    elif 2000 <= year <= 2009: return "2000s"
+    elif 2010 <= year <= 2019: return "2010s"
+    elif 2020 <= year <= 2023: return "2020s"
+    else: return "Other"
+
+
+def decade_averages(filtered):
+    """Average Kg_per_ha per decade and the % change from first to last decade"""
+    store = filtered.dataset.store
+    block = filtered.kg_per_ha_block()
+    decades = np.array([get_decade(y) for y in store.years[filtered.years]])
+    labels = sorted(set(decades))
+    avg_decade = pd.DataFrame({
+        "Decade": labels,
+        "Avg_Kg_per_ha": [_nanmean(block[:, decades == label]) for label in labels],
+    }).dropna().reset_index(drop=True)
+    pct_increase = None
+    if len(avg_decade) > 1:
+        first_decade = avg_decade["Avg_Kg_per_ha"].iloc[0]
+        last_decade = avg_decade["Avg_Kg_per_ha"].iloc[-1]
+        pct_increase = ((last_decade - first_decade) / first_decade) * 100
+    return avg_decade, pct_increase
+
+
+def leadership(store, countries, focus_country, year_range):
+    """Regional baseline plus the focus country's series from the time-series store"""
+    return {
+        "regional": store.regional_mean(countries, year_range),
+        "recent": store.recent_mean(countries, year_range[1]),
+        "focus": store.country_frame(focus_country, year_range),
+    }
+
+
+def type_pivot(filtered):
+    """Country x Pesticide_Type average tonnes (excluding the total)"""
+    store = filtered.dataset.store
+    type_idx = np.array([i for i in filtered.type_idx if store.types[i] != TOTAL_TYPE], dtype=int)
+    block = store.tonnes[filtered.country_idx[:, None], type_idx[None, :], filtered.years]
+    pivot = pd.DataFrame(
+        _nanmean(block, axis=2),
+        index=pd.Index(store.countries[filtered.country_idx], name="Country"),
+        columns=pd.Index(store.types[type_idx].astype(str), name="Pesticide_Type"),
+    )
+    # Countries and types without any rows drop out; gaps within a country read as 0
+    return pivot.dropna(how="all").dropna(axis=1, how="all").fillna(0)
+
+
+def outliers(filtered):
+    """IQR outliers of Kg_per_ha over the per-type rows, and the Tonnes/Kg_per_ha correlation"""
+    data = filtered.dataset.data
+    if filtered.selected:
+        rows = _row_positions(data, filtered.countries, filtered.year_range, types=filtered.types, exclude_type=TOTAL_TYPE)
+    else:
+        rows = np.array([], dtype=int)
+    df = _take(data, rows)
+    Q1 = df["Kg_per_ha"].quantile(0.25)
+    Q3 = df["Kg_per_ha"].quantile(0.75)
+    IQR = Q3 - Q1
+    found = df[(df["Kg_per_ha"] < (Q1 - 1.5*IQR)) | (df["Kg_per_ha"] > (Q3 + 1.5*IQR))]
+    return df, found, df["Tonnes"].corr(df["Kg_per_ha"])
+
+
+def outlier_rows(filtered):
+    """Just the outlier rows: the table the Outliers section and /outliers page through"""
+    return outliers(filtered)[1]
+
+
+def _json_value(v):
+    if pd.isna(v):
+        return None
+    return v.item() if hasattr(v, "item") else v
+
+
+def to_records(df):
+    """JSON-ready list of row dicts (categoricals as strings, NaN as None); the index is dropped"""
+    df = df.astype({c: str for c in df.select_dtypes("category").columns})
+    return [{k: _json_value(v) for k, v in row.items()} for row in df.to_dict(orient="records")]
@@ -0,0 +1,104 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import summary
+import trends
+import validate
+from dataset import load_source, intensity_table, tonnage_table
+from timeseries_store import TimeSeriesStore
+
+# Seconds between checks of the data source for changes
+DEFAULT_POLL_INTERVAL = float(os.environ.get("PESTICIDE_REFRESH_SECONDS", 30))
+
+
+def source_signature(path):
+    """Cheap change marker for a data file: (mtime, size)"""
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+class DatasetVersion:
+    """One immutable, fully built version of the dataset and its derived indexes"""
+
+    def __init__(self, version, path, signature):
+        self.version = version
+        self.path = path
+        self.signature = signature
+        data = load_source(path)
+        # Invariant checks; bad partitions are flagged, the version still loads
+        self.validation = validate.validate(data)
+        # Rows missing a Country, Pesticide_Type or Year cannot be placed and are left out
+        self.data = validate.drop_unkeyed(data)
+        self.intensity = intensity_table(self.data)
+        self.tonnage = tonnage_table(self.data)
+        self.store = TimeSeriesStore(self.data)
+        # Full-dataset statistics at every grouping level, rebuilt with each version
+        self.profiles = summary.profiles(self.intensity, self.tonnage)
+        # Trend coefficients and volatility for every series over the full range
+        self.trends = trends.TrendFits(self.store)
+        # Fits for other year ranges, filled lazily by trends.fits_for
+        self.range_fits = OrderedDict()
+        self.loaded_at = time.time()
+
+
+class DatasetRef:
+    """Holds the current DatasetVersion and swaps in new ones atomically.
+
+    A rerun grabs ``current()`` once and keeps using that object, so a swap
+    never changes data underneath a rerun that is already in flight.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._current = DatasetVersion(1, path, source_signature(path))
+        self.last_error = None
+        self._failed_signature = None
+
+    def current(self):
+        return self._current
+
+    def refresh(self):
+        """Rebuild if the source changed; returns True when a new version was swapped in"""
+        # Only one rebuild at a time; readers never take the lock
+        with self._lock:
+            # Stays None when the source is missing (e.g. mid-deploy), so the next poll retries
+            signature = None
+            try:
+                signature = source_signature(self.path)
+                if signature in (self._current.signature, self._failed_signature):
+                    return False
+                new_version = DatasetVersion(self._current.version + 1, self.path, signature)
+                if new_version.data.empty:
+                    raise ValueError("data source is empty")
+            except Exception as e:
+                # Keep serving the previous version if the new data cannot be loaded
+                self.last_error = f"{type(e).__name__}: {e}"
+                self._failed_signature = signature
+                return False
+            self._current = new_version
+            self.last_error = None
+            return True
+
+
+class BackgroundRefresher(threading.Thread):
+    """Daemon thread that polls the data source and refreshes a DatasetRef"""
+
+    def __init__(self, ref, interval=DEFAULT_POLL_INTERVAL):
+        super().__init__(name="dataset-refresher", daemon=True)
+        self.ref = ref
+        self.interval = interval
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            try:
+                self.ref.refresh()
+            except Exception as e:
+                # Record it and keep polling; a dead thread would never refresh again
+                self.ref.last_error = f"{type(e).__name__}: {e}"
+
+    def stop(self):
+        self._stop_event.set()
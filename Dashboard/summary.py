@@ -0,0 +1,228 @@
+"""Descriptive statistics for every grouping level in one sort per metric.
+
+Each metric's values are sorted once. Count, sum and M2 (squared deviations
+from the mean) come from ``np.bincount`` at the finest grouping, and every
+level's mean, variance and standard deviation are reduced from those group
+moments. Min, max, median and any quantiles are read straight off each
+group's sorted segment, after a linear radix regrouping of the sorted
+values per level. There are no per-group Python loops and no repeated
+groupby calls.
+"""
+import numpy as np
+import pandas as pd
+
+from queries import TOTAL_TYPE
+
+STATS = ["count", "sum", "mean", "std", "var", "min", "median", "max"]
+DEFAULT_QUANTILES = (0.25, 0.75)
+
+# Grouping level -> key columns (overall is a single group)
+LEVELS = {
+    "overall": [],
+    "country": ["Country"],
+    "country_type": ["Country", "Pesticide_Type"],
+    "year_country": ["Year", "Country"],
+}
+
+# Metric -> table it is defined on. Kg_per_ha is a country-year value and
+# Tonnes is per type (the "Pesticides (total)" rows are left out).
+METRICS = {"Kg_per_ha": "intensity", "Tonnes": "tonnage"}
+
+
+def quantile_name(q):
+    return f"q{q * 100:g}"
+
+
+def _moments(codes, values, n_groups):
+    """Count, sum and M2 (sum of squared deviations from the group mean) per group code"""
+    count = np.bincount(codes, minlength=n_groups)
+    total = np.bincount(codes, weights=values, minlength=n_groups)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = total / count
+    deviation = values - mean[codes]
+    return count, total, np.bincount(codes, weights=deviation * deviation, minlength=n_groups)
+
+
+def _reduce_moments(moments, mapping, n_groups):
+    """Moments of coarser groups from those of the finer groups ``mapping`` assigns to them.
+
+    M2 combines exactly (Chan et al.): each finer group adds its own M2 plus
+    its count times the squared gap between its mean and the coarser mean.
+    """
+    count, total, m2 = moments
+    coarse_count = np.bincount(mapping, weights=count, minlength=n_groups).astype(np.int64)
+    coarse_total = np.bincount(mapping, weights=total, minlength=n_groups)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        gap = np.where(count > 0, total / count - (coarse_total / coarse_count)[mapping], 0.0)
+    coarse_m2 = np.bincount(mapping, weights=m2 + count * gap * gap, minlength=n_groups)
+    return coarse_count, coarse_total, coarse_m2
+
+
+def _group_sorted(codes, values, n_groups):
+    """Values grouped by code and ascending within each group, given values already in ascending order.
+
+    A stable sort of small integer codes is a radix sort in numpy, so
+    regrouping is a linear pass rather than another comparison sort.
+    """
+    small = n_groups <= np.iinfo(np.uint16).max + 1
+    order = np.argsort(codes.astype(np.uint16 if small else np.int64), kind="stable")
+    return values[order]
+
+
+def _stats(moments, values, quantiles, ddof):
+    """Every statistic per group from its moments and its values in group-then-value order"""
+    count, total, m2 = moments
+    start = np.cumsum(count) - count
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = total / count
+        var = m2 / (count - ddof)
+    var[count <= ddof] = np.nan
+
+    empty = count == 0
+    last = np.maximum(start + count - 1, 0)
+    # Guard the lookups below; empty groups are masked afterwards
+    padded = np.append(values, np.nan)
+
+    def at(position):
+        """Linearly interpolated value at a fractional position within each group's segment"""
+        lo = np.floor(position).astype(int)
+        frac = position - lo
+        with np.errstate(invalid="ignore"):
+            out = padded[lo] * (1 - frac) + padded[np.minimum(lo + 1, last)] * frac
+        out[empty] = np.nan
+        return out
+
+    result = {
+        "count": count,
+        "sum": total,
+        "mean": mean,
+        "std": np.sqrt(var),
+        "var": var,
+        "min": at(start.astype(float)),
+        "median": at(start + 0.5 * (count - 1)),
+        "max": at(last.astype(float)),
+    }
+    for q in quantiles:
+        result[quantile_name(q)] = at(start + q * (count - 1))
+    return result
+
+
+def group_stats(codes, values, n_groups, quantiles=DEFAULT_QUANTILES, ddof=1):
+    """Every statistic for every group code in [0, n_groups) from a single sort.
+
+    Returns a dict of stat name -> array of length n_groups (NaN, or 0 for
+    count and sum, where a group has no values). Quantiles interpolate
+    linearly, like pandas.
+    """
+    valid = ~np.isnan(values)
+    codes, values = codes[valid], values[valid]
+    by_value = np.argsort(values, kind="stable")
+    grouped = _group_sorted(codes[by_value], values[by_value], n_groups)
+    return _stats(_moments(codes, values, n_groups), grouped, quantiles, ddof)
+
+
+def _key_codes(table, keys, rows):
+    """Dense group code per row plus, per key, the labels and size of its axis"""
+    codes = np.zeros(len(rows), dtype=np.int64)
+    axes = []
+    for key in keys:
+        column = table[key]
+        if isinstance(column.dtype, pd.CategoricalDtype):
+            labels = np.asarray(column.cat.categories)
+            key_codes = column.cat.codes.to_numpy()[rows]
+        else:
+            labels, inverse = np.unique(column.to_numpy(), return_inverse=True)
+            key_codes = inverse[rows]
+        codes = codes * len(labels) + key_codes
+        axes.append(labels)
+    return codes, axes
+
+
+def _frame(keys, axes, metric, stats):
+    """One row per non-empty group: key labels plus ``<metric>_<stat>`` columns"""
+    sizes = [len(labels) for labels in axes]
+    present = np.flatnonzero(stats["count"] > 0)
+    out = {}
+    for key, labels, positions in zip(keys, axes, np.unravel_index(present, sizes) if sizes else []):
+        out[key] = labels[positions]
+    for name, values in stats.items():
+        out[f"{metric}_{name}"] = values[present]
+    return pd.DataFrame(out)
+
+
+def profile(table, keys, metric, rows=None, quantiles=DEFAULT_QUANTILES):
+    """Statistics of one metric for one grouping level, one row per non-empty group"""
+    rows = np.arange(len(table)) if rows is None else rows
+    codes, axes = _key_codes(table, keys, rows)
+    n_groups = int(np.prod([len(labels) for labels in axes])) if axes else 1
+    values = table[metric].to_numpy(dtype=float)[rows]
+    return _frame(keys, axes, metric, group_stats(codes, values, n_groups, quantiles))
+
+
+def metric_profiles(table, metric, rows, quantiles=DEFAULT_QUANTILES):
+    """Level name -> statistics of one metric, for every level whose keys are columns of ``table``.
+
+    The values are sorted once. Count, sum and M2 are taken at the finest
+    grouping (every key of every level) and reduced to each level from
+    there. Order statistics cannot be derived from moments, so each level's
+    min, median, max and quantiles come from regrouping the sorted values,
+    a linear radix pass over its group codes.
+    """
+    levels = {level: keys for level, keys in LEVELS.items() if all(key in table.columns for key in keys)}
+    fine_keys = list(dict.fromkeys(key for keys in levels.values() for key in keys))
+    codes, axes = _key_codes(table, fine_keys, rows)
+    sizes = [len(labels) for labels in axes]
+    n_fine = int(np.prod(sizes))
+    values = table[metric].to_numpy(dtype=float)[rows]
+    valid = ~np.isnan(values)
+    codes, values = codes[valid], values[valid]
+
+    fine = _moments(codes, values, n_fine)
+    by_value = np.argsort(values, kind="stable")
+    codes, values = codes[by_value], values[by_value]
+    # Each finest group's position along every key's axis
+    position = dict(zip(fine_keys, np.unravel_index(np.arange(n_fine), sizes)))
+
+    result = {}
+    for level, keys in levels.items():
+        level_axes = [axes[fine_keys.index(key)] for key in keys]
+        if keys:
+            mapping = np.ravel_multi_index([position[key] for key in keys], [len(labels) for labels in level_axes])
+        else:
+            mapping = np.zeros(n_fine, dtype=np.int64)
+        n_groups = int(np.prod([len(labels) for labels in level_axes])) if keys else 1
+        moments = _reduce_moments(fine, mapping, n_groups)
+        stats = _stats(moments, _group_sorted(mapping[codes], values, n_groups), quantiles, ddof=1)
+        result[level] = _frame(keys, level_axes, metric, stats)
+    return result
+
+
+def profiles(intensity, tonnage, intensity_rows=None, tonnage_rows=None, quantiles=DEFAULT_QUANTILES):
+    """Level name -> DataFrame of key columns plus ``<metric>_<stat>`` columns for every metric defined there.
+
+    ``intensity_rows`` / ``tonnage_rows`` restrict the tables to those row
+    positions (default: all rows) without copying them.
+    """
+    tables = {"intensity": intensity, "tonnage": tonnage}
+    intensity_rows = np.arange(len(intensity)) if intensity_rows is None else intensity_rows
+    tonnage_rows = np.arange(len(tonnage)) if tonnage_rows is None else tonnage_rows
+    is_total = (tonnage["Pesticide_Type"] == TOTAL_TYPE).to_numpy()
+    rows = {"intensity": intensity_rows, "tonnage": tonnage_rows[~is_total[tonnage_rows]]}
+    by_metric = {metric: metric_profiles(tables[table], metric, rows[table], quantiles) for metric, table in METRICS.items()}
+    result = {}
+    for level, keys in LEVELS.items():
+        frames = [levels[level] for levels in by_metric.values() if level in levels]
+        merged = frames[0]
+        for frame in frames[1:]:
+            merged = merged.merge(frame, on=keys, how="outer") if keys else pd.concat([merged, frame], axis=1)
+        result[level] = merged
+    return result
+
+
+def filtered_profiles(filtered, quantiles=DEFAULT_QUANTILES):
+    """Profiles for a filter state; the dataset's precomputed ones when nothing is filtered out"""
+    dataset = filtered.dataset
+    if (quantiles == DEFAULT_QUANTILES and len(filtered.intensity_rows) == len(dataset.intensity)
+            and len(filtered.tonnage_rows) == len(dataset.tonnage)):
+        return dataset.profiles
+    return profiles(dataset.intensity, dataset.tonnage, filtered.intensity_rows, filtered.tonnage_rows, quantiles)
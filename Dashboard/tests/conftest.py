@@ -0,0 +1,27 @@
+import os
+import sys
+
+import pytest
+
+DASHBOARD = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, DASHBOARD)
+
+from dataset import DATA_FILENAME  # noqa: E402
+import validate  # noqa: E402
+from refresh import DatasetVersion, source_signature  # noqa: E402
+
+DATA_PATH = os.path.join(DASHBOARD, DATA_FILENAME)
+
+
+@pytest.fixture(scope="session", autouse=True)
+def validation_cache(tmp_path_factory):
+    """Validation reports go to a temporary directory, never the user's cache"""
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(validate, "CACHE_DIR", str(tmp_path_factory.mktemp("validation_cache")))
+        yield
+
+
+@pytest.fixture(scope="session")
+def dataset(validation_cache):
+    """The bundled dataset, loaded once like the dashboard does"""
+    return DatasetVersion(1, DATA_PATH, source_signature(DATA_PATH))
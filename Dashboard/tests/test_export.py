@@ -0,0 +1,61 @@
+import io
+import zipfile
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import export
+from queries import apply_filters
+
+
+@pytest.fixture
+def filtered(dataset):
+    return apply_filters(dataset, ["Malawi", "South Africa", "Zambia"], list(dataset.store.types), (1995, 2020))
+
+
+@pytest.mark.parametrize("chunk_rows", [37, export.CHUNK_ROWS])
+@pytest.mark.parametrize("keys", [["Country"], ["Country", "Pesticide_Type"]])
+def test_summary_matches_pandas_groupby(filtered, keys, chunk_rows):
+    stats = [("Kg_per_ha", ["count", "mean", "std"]), ("Tonnes", ["count", "mean", "std"])]
+    acc = export.SummaryAccumulator(keys, stats)
+    for chunk in export.iter_chunks(filtered, chunk_rows):
+        acc.add(chunk)
+    rows = filtered.dataset.data.take(filtered.data_rows)
+    expected = rows.groupby(keys, observed=True)[["Kg_per_ha", "Tonnes"]].agg(["count", "mean", "std"])
+    expected.columns = [f"{col}_{stat}" for col, stat in expected.columns]
+    expected = expected.round(2).reset_index()
+    result = acc.result()
+    for key in keys:
+        result[key] = result[key].astype(str)
+        expected[key] = expected[key].astype(str)
+    pd.testing.assert_frame_equal(result, expected[result.columns], check_dtype=False)
+
+
+def test_std_does_not_cancel_on_large_values():
+    rng = np.random.default_rng(0)
+    values = 1e9 + rng.normal(0, 1, 1000)
+    chunk = pd.DataFrame({"Country": "A", "Kg_per_ha": values, "Tonnes": values})
+    acc = export.SummaryAccumulator(["Country"], [("Tonnes", ["std"])])
+    for start in range(0, len(chunk), 64):
+        acc.add(chunk.iloc[start:start + 64])
+    assert acc.result()["Tonnes_std"].iloc[0] == round(values.std(ddof=1), 2)
+
+
+def test_xlsx_is_a_valid_workbook(filtered):
+    workbook = zipfile.ZipFile(io.BytesIO(export.export_bytes(filtered, "xlsx")))
+    assert workbook.testzip() is None
+    names = set(workbook.namelist())
+    assert {"[Content_Types].xml", "_rels/.rels", "xl/workbook.xml", "xl/styles.xml"} <= names
+    assert {f"xl/worksheets/sheet{n}.xml" for n in range(1, len(export.SHEETS) + 1)} <= names
+    for sheet in export.SHEETS:
+        assert f'name="{sheet}"' in workbook.read("xl/workbook.xml").decode()
+    data_sheet = workbook.read("xl/worksheets/sheet1.xml").decode()
+    assert data_sheet.count("<row>") == len(filtered.data_rows) + 1
+    assert data_sheet.endswith("</sheetData></worksheet>")
+
+
+def test_csv_has_every_filtered_row(filtered):
+    frame = pd.read_csv(io.BytesIO(export.export_bytes(filtered, "csv")))
+    assert list(frame.columns) == export.DATA_COLUMNS
+    assert len(frame) == len(filtered.data_rows)
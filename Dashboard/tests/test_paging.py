@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import paging
+import queries
+
+
+@pytest.fixture
+def table():
+    return paging.PagedTable(pd.DataFrame({
+        "Country": ["Malawi", "Zambia", "Angola", "Botswana", "Zambia", "Lesotho", "Namibia"],
+        "Value": [3.0, 1.0, np.nan, 7.0, 2.0, 5.0, 4.0],
+    }))
+
+
+def test_pages_slice_the_rows_in_order(table):
+    rows, matching, n_pages = table.page(2, page_size=3)
+    assert (matching, n_pages) == (7, 3)
+    assert list(rows["Country"]) == ["Botswana", "Zambia", "Lesotho"]
+    rows, _, _ = table.page(3, page_size=3)
+    assert list(rows["Country"]) == ["Namibia"]
+
+
+@pytest.mark.parametrize("page, expected", [(99, ["Namibia"]), (0, ["Malawi", "Zambia", "Angola"]), (-4, ["Malawi", "Zambia", "Angola"])])
+def test_out_of_range_pages_are_clamped(table, page, expected):
+    rows, _, n_pages = table.page(page, page_size=3)
+    assert n_pages == 3
+    assert list(rows["Country"]) == expected
+
+
+def test_sort_orders_keep_missing_values_last(table):
+    ascending, _, _ = table.page(1, page_size=10, sort="Value")
+    assert list(ascending["Value"].iloc[:-1]) == [1.0, 2.0, 3.0, 4.0, 5.0, 7.0]
+    assert np.isnan(ascending["Value"].iloc[-1])
+    descending, _, _ = table.page(1, page_size=10, sort="Value", ascending=False)
+    assert list(descending["Value"].iloc[:-1]) == [7.0, 5.0, 4.0, 3.0, 2.0, 1.0]
+    assert np.isnan(descending["Value"].iloc[-1])
+    # Stable: ties keep their original order
+    by_country, _, _ = table.page(1, page_size=10, sort="Country")
+    assert list(by_country.loc[by_country["Country"] == "Zambia", "Value"]) == [1.0, 2.0]
+
+
+def test_text_filter_is_case_insensitive(table):
+    rows, matching, n_pages = table.page(1, page_size=3, sort="Value", query="  ZAM ")
+    assert (matching, n_pages) == (2, 1)
+    assert list(rows["Value"]) == [1.0, 2.0]
+    assert table.page(1, query="nowhere")[1:] == (0, 1)
+
+
+def test_views_and_pages_are_cached(table):
+    assert table.view("Value", True, "a") is table.view("Value", True, " A")
+    first, _, _ = table.page(2, page_size=3, sort="Country")
+    assert table.page(2, page_size=3, sort="Country")[0] is first
+    assert table.page(1, page_size=3, sort="Country")[0] is not first
+
+
+def test_tables_are_built_once_per_filter_state(dataset):
+    calls = []
+
+    def build(filtered):
+        calls.append(filtered)
+        return queries.outlier_rows(filtered)
+
+    countries = list(dataset.store.countries)
+    filtered = queries.apply_filters(dataset, countries, list(dataset.store.types), (1990, 2023))
+    table = paging.paged_table("test_outliers", filtered, build)
+    again = queries.apply_filters(dataset, countries, list(dataset.store.types), (1990, 2023))
+    assert paging.paged_table("test_outliers", again, build) is table
+    assert len(calls) == 1
+    narrower = queries.apply_filters(dataset, countries, list(dataset.store.types), (2000, 2023))
+    assert paging.paged_table("test_outliers", narrower, build) is not table
+    assert len(calls) == 2
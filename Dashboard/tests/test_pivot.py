@@ -0,0 +1,56 @@
+import gc
+import weakref
+
+import pandas as pd
+import pytest
+
+import pivot
+from conftest import DATA_PATH
+from queries import apply_filters
+from refresh import DatasetVersion, source_signature
+
+
+def everything(dataset, year_range=(1990, 2023)):
+    return apply_filters(dataset, list(dataset.store.countries), list(dataset.store.types), year_range)
+
+
+@pytest.mark.parametrize("dims", [["Period"], ["Country", "Period"]])
+@pytest.mark.parametrize("aggs", [["sum"], ["sum", "count"]])
+def test_wide_spreads_any_dimension(dataset, dims, aggs):
+    result = pivot.run_query(everything(dataset), dims, ["Tonnes"], aggs, 10, "numpy")
+    wide = result.wide("Period")
+    assert len(wide) == (1 if dims == ["Period"] else len(dataset.store.countries))
+    assert len(wide.columns) == len(dims) - 1 + 4 * len(aggs)
+    assert all(dtype.kind in "if" for dtype in wide.dtypes.iloc[len(dims) - 1:])
+
+
+def test_results_do_not_keep_old_versions_alive():
+    version = DatasetVersion(1, DATA_PATH, source_signature(DATA_PATH))
+    first = pivot.run_query(everything(version), ["Country"], ["Tonnes"], ["sum"], 5, "numpy")
+    assert pivot.run_query(everything(version), ["Country"], ["Tonnes"], ["sum"], 5, "numpy") is first
+    released = weakref.ref(version)
+    del version
+    gc.collect()
+    assert released() is None
+
+
+QUERIES = [
+    (["Country"], ["Tonnes", "Kg_per_ha"], ["sum", "mean", "count"]),
+    (["Country", "Pesticide_Type", "Period"], ["Tonnes"], ["sum", "median", "min", "max", "std", "count"]),
+    (["Period"], ["Kg_per_ha"], ["mean", "std", "median"]),
+    (["Pesticide_Type", "Country"], ["Tonnes", "Kg_per_ha"], ["max"]),
+    ([], ["Tonnes", "Kg_per_ha"], ["sum", "count", "std"]),
+]
+
+
+@pytest.mark.parametrize("engine", ["duckdb", "polars"])
+@pytest.mark.parametrize("dims, measures, aggs", QUERIES)
+def test_engines_match_numpy(dataset, engine, dims, measures, aggs):
+    pytest.importorskip(engine)
+    filtered = apply_filters(dataset, ["Angola", "Malawi", "South Africa", "Zambia"], list(dataset.store.types), (1995, 2021))
+    expected = pivot.run_query(filtered, dims, measures, aggs, 5, "numpy")
+    result = pivot.run_query(filtered, dims, measures, aggs, 5, engine)
+    assert result.engine == engine
+    assert result.skipped == expected.skipped
+    assert result.value_columns == expected.value_columns
+    pd.testing.assert_frame_equal(result.table, expected.table, check_dtype=False, check_exact=False, rtol=1e-9)
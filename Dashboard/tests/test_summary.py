@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import summary
+from queries import TOTAL_TYPE, apply_filters
+
+PANDAS_STATS = {
+    "count": "count", "sum": "sum", "mean": "mean", "std": "std", "var": "var",
+    "min": "min", "median": "median", "max": "max",
+    "q25": lambda s: s.quantile(0.25), "q75": lambda s: s.quantile(0.75),
+}
+
+
+def expected_profile(table, keys, metric):
+    """The same statistics from a pandas groupby"""
+    values = table[keys + [metric]].astype({key: str for key in keys if key != "Year"})
+    if keys:
+        stats = values.groupby(keys)[metric].agg(list(PANDAS_STATS.values()))
+        stats.columns = [f"{metric}_{name}" for name in PANDAS_STATS]
+        return stats.reset_index()
+    return pd.DataFrame({f"{metric}_{name}": [values[metric].agg(agg)] for name, agg in PANDAS_STATS.items()})
+
+
+def assert_matches(result, table, keys, metric):
+    expected = expected_profile(table, keys, metric)
+    result = result[list(expected.columns)].astype({key: str for key in keys if key != "Year"})
+    result = result.dropna(subset=[f"{metric}_count"])
+    result = result[result[f"{metric}_count"] > 0].sort_values(keys).reset_index(drop=True) if keys else result
+    pd.testing.assert_frame_equal(result, expected, check_dtype=False, check_exact=False, rtol=1e-9)
+
+
+@pytest.mark.parametrize("level", list(summary.LEVELS))
+def test_profile_matches_pandas(dataset, level):
+    keys = summary.LEVELS[level]
+    tonnage = dataset.tonnage[(dataset.tonnage["Pesticide_Type"] != TOTAL_TYPE).to_numpy()]
+    rows = np.flatnonzero((dataset.tonnage["Pesticide_Type"] != TOTAL_TYPE).to_numpy())
+    assert_matches(summary.profile(dataset.tonnage, keys, "Tonnes", rows), tonnage, keys, "Tonnes")
+    if all(key in dataset.intensity.columns for key in keys):
+        assert_matches(summary.profile(dataset.intensity, keys, "Kg_per_ha"), dataset.intensity, keys, "Kg_per_ha")
+
+
+@pytest.mark.parametrize("year_range", [(1990, 2023), (2000, 2010)])
+def test_filtered_profiles_match_pandas(dataset, year_range):
+    filtered = apply_filters(dataset, ["Botswana", "Malawi", "Zambia"], list(dataset.store.types), year_range)
+    intensity = dataset.intensity.take(filtered.intensity_rows)
+    tonnage = dataset.tonnage.take(filtered.tonnage_rows)
+    tonnage = tonnage[(tonnage["Pesticide_Type"] != TOTAL_TYPE).to_numpy()]
+    for level, table in summary.filtered_profiles(filtered).items():
+        keys = summary.LEVELS[level]
+        assert_matches(table, tonnage, keys, "Tonnes")
+        if "Kg_per_ha_count" in table.columns:
+            assert_matches(table, intensity, keys, "Kg_per_ha")
+
+
+def test_unfiltered_profiles_are_the_precomputed_ones(dataset):
+    filtered = apply_filters(dataset, list(dataset.store.countries), list(dataset.store.types), (1990, 2023))
+    assert summary.filtered_profiles(filtered) is dataset.profiles
@@ -0,0 +1,33 @@
+import numpy as np
+
+from timeseries_store import DEFAULT_WINDOW, _rolling_zscore
+
+
+def test_rolling_z_baseline_excludes_the_current_point():
+    values = np.array([[1.0, 1.1, 0.9, 1.0, 1.05, 1.0, 10.0]])
+    z = _rolling_zscore(values, DEFAULT_WINDOW)
+    baseline = values[0, 1:6]
+    assert np.isclose(z[0, -1], (10.0 - baseline.mean()) / baseline.std())
+    # A window containing the spike would cap it at (w - 1) / sqrt(w)
+    assert z[0, -1] > (DEFAULT_WINDOW - 1) / np.sqrt(DEFAULT_WINDOW)
+
+
+def test_rolling_z_needs_two_preceding_points():
+    z = _rolling_zscore(np.array([[1.0, 2.0, 3.0, 4.0]]), DEFAULT_WINDOW)
+    assert np.isnan(z[0, :2]).all()
+    assert np.isfinite(z[0, 2:]).all()
+
+
+def test_store_z_scores_are_finite_or_nan(dataset):
+    z = dataset.store.kg_per_ha_rolling_z
+    assert not np.isinf(z).any()
+    assert np.isnan(z[:, :2]).all()
+
+
+def test_regional_baseline_is_cached_per_filter_state(dataset):
+    store = dataset.store
+    countries = ["Malawi", "Zambia"]
+    regional = store.regional_mean(countries, (2000, 2010))
+    assert store.regional_mean(list(countries), (2000, 2010)) is regional
+    assert store.regional_mean(countries, (2000, 2011)) is not regional
+    assert store.recent_mean(countries, 2010) is store.recent_mean(countries, 2010)
@@ -0,0 +1,25 @@
+import numpy as np
+import pytest
+
+import trends
+
+
+@pytest.mark.parametrize("year_range", [(2020, 2020), (2020, 2021)])
+def test_no_projection_without_residual_degrees_of_freedom(dataset, year_range):
+    fits = trends.fits_for(dataset, year_range)
+    assert fits.project("South Africa").empty
+
+
+def test_projection_band_is_finite_and_ordered(dataset):
+    projection = trends.fits_for(dataset, (2010, 2023)).project("South Africa")
+    assert len(projection) == trends.DEFAULT_HORIZON
+    assert np.isfinite(projection[["Lower", "Upper"]].to_numpy()).all()
+    assert (projection["Lower"] <= projection["Projection"]).all()
+    assert (projection["Projection"] <= projection["Upper"]).all()
+
+
+def test_range_fits_are_cached_on_the_version(dataset):
+    fits = trends.fits_for(dataset, (2000, 2010))
+    assert trends.fits_for(dataset, (2000, 2010)) is fits
+    assert dataset.range_fits[(2000, 2010)] is fits
+    assert trends.fits_for(dataset, (1990, 2023)) is dataset.trends
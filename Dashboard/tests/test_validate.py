@@ -0,0 +1,75 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import validate
+from conftest import DATA_PATH
+from refresh import DatasetVersion, source_signature
+
+SOURCE_COLUMNS = list(pd.read_csv(DATA_PATH, nrows=0).columns)
+
+
+def load_with(tmp_path, edit):
+    df = pd.read_csv(DATA_PATH)
+    edit(df)
+    path = tmp_path / "data.csv"
+    df.to_csv(path, index=False)
+    return DatasetVersion(1, str(path), source_signature(str(path)))
+
+
+@pytest.fixture(autouse=True)
+def isolated_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(validate, "CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setattr(validate, "_reports", validate.OrderedDict())
+
+
+def test_bundled_data_is_clean(dataset):
+    assert dataset.validation.ok
+
+
+@pytest.mark.parametrize("column", SOURCE_COLUMNS)
+def test_blank_cell_is_flagged_without_failing_the_load(tmp_path, column):
+    def blank(df):
+        df.loc[5, column] = np.nan
+
+    version = load_with(tmp_path, blank)
+    report = version.validation
+    assert report.counts["missing_values"] >= 1
+    # Rows that cannot be placed are dropped; everything else still loads
+    dropped = 1 if column in validate.KEY_COLUMNS else 0
+    assert len(version.data) == 1360 - dropped
+    assert not version.data[validate.KEY_COLUMNS].isna().any().any()
+    assert len(version.store.countries) == 10
+    assert version.data["Year"].dtype.kind == "i"
+
+
+def test_flags_each_invariant(tmp_path):
+    def break_invariants(df):
+        botswana_1990 = (df["Country"] == "Botswana") & (df["Year"] == 1990)
+        df.loc[botswana_1990 & (df["Pesticide_Type"] == "Herbicides"), "Tonnes"] = -3
+        df.loc[(df["Country"] == "Namibia") & (df["Year"] == 1990) & (df["Pesticide_Type"] == "Herbicides"), "Kg_per_ha"] += 1
+        df.drop(df.index[(df["Country"] == "Malawi") & (df["Year"] == 2000)], inplace=True)
+
+    report = load_with(tmp_path, break_invariants).validation
+    flagged = {(row.Check, row.Country, row.Year) for row in report.issues.itertuples()}
+    assert ("negative_values", "Botswana", 1990) in flagged
+    assert ("total_matches_types", "Botswana", 1990) in flagged
+    assert ("single_kg_per_ha", "Namibia", 1990) in flagged
+    assert ("year_coverage", "Malawi", 2000) in flagged
+
+
+def test_report_survives_the_disk_cache(tmp_path):
+    def blank_country(df):
+        df.loc[5, "Country"] = np.nan
+
+    report = load_with(tmp_path, blank_country).validation
+    validate._reports.clear()
+    cached = validate._read_cached(report.dataset_hash)
+    assert cached is not None
+    pd.testing.assert_frame_equal(cached.issues, report.issues)
+
+
+def test_in_memory_reports_are_bounded(dataset):
+    for i in range(validate.MAX_REPORTS + 3):
+        validate.validate(dataset.data.assign(Tonnes=dataset.data["Tonnes"] + i))
+    assert len(validate._reports) == validate.MAX_REPORTS
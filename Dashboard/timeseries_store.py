@@ -0,0 +1,201 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+# Number of years used for rolling metrics (matches the "last 5 years" views)
+DEFAULT_WINDOW = 5
+
+# Regional baselines kept per store, one per (countries, year range) filter state
+MAX_BASELINES = 32
+
+
+def _pct_change(values):
+    """Year-over-year % change along the last axis (NaN where undefined)"""
+    yoy = np.full(values.shape, np.nan)
+    prev = values[..., :-1]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        change = (values[..., 1:] - prev) / prev * 100
+    change[~np.isfinite(change)] = np.nan
+    yoy[..., 1:] = change
+    return yoy
+
+
+def _rolling_stats(values, window, lag=0):
+    """Trailing rolling mean and std along the last axis, ignoring NaNs.
+
+    With ``lag=1`` each window holds the ``window`` points before the current
+    one, which is the baseline a z-score needs.
+    """
+    valid = ~np.isnan(values)
+    filled = np.where(valid, values, 0.0)
+    pad = [(0, 0)] * (values.ndim - 1) + [(1, 0)]
+    csum = np.pad(np.cumsum(filled, axis=-1), pad)
+    csq = np.pad(np.cumsum(filled ** 2, axis=-1), pad)
+    ccount = np.pad(np.cumsum(valid, axis=-1), pad)
+
+    n_years = values.shape[-1]
+    end = np.arange(1, n_years + 1) - lag
+    start = np.maximum(end - window, 0)
+    total = csum[..., end] - csum[..., start]
+    total_sq = csq[..., end] - csq[..., start]
+    count = ccount[..., end] - ccount[..., start]
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean = total / count
+        var = total_sq / count - mean ** 2
+    std = np.sqrt(np.clip(var, 0, None))
+    # Only report a value once the window holds at least two points
+    mean[count < 2] = np.nan
+    std[count < 2] = np.nan
+    return mean, std
+
+
+def _rolling_zscore(values, window):
+    """Deviation of each point from the preceding window, in that window's std.
+
+    The current point is left out of its own baseline: a window that includes
+    it caps |z| at (window - 1) / sqrt(window), so a lone spike never stands out.
+    """
+    mean, std = _rolling_stats(values, window, lag=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        z = (values - mean) / std
+    z[~np.isfinite(z)] = np.nan
+    return z
+
+
+def _cagr(values, start, end):
+    """Compound annual growth rate (%) between two year positions"""
+    first = values[..., start]
+    last = values[..., end]
+    periods = end - start
+    if periods <= 0:
+        return np.full(first.shape, np.nan)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rate = (np.power(last / first, 1.0 / periods) - 1) * 100
+    rate[~np.isfinite(rate)] = np.nan
+    return rate
+
+
+class TimeSeriesStore:
+    """Contiguous (country, [type,] year) arrays with precomputed trend metrics.
+
+    Built once from the full dataset. Every metric is computed for all
+    countries and types in a single vectorized pass, so a section only has to
+    slice out the rows and years it needs.
+    """
+
+    def __init__(self, data, window=DEFAULT_WINDOW):
+        self.window = window
+        self.countries = np.array(sorted(data["Country"].unique()))
+        self.types = np.array(sorted(data["Pesticide_Type"].unique()))
+        self.years = np.arange(int(data["Year"].min()), int(data["Year"].max()) + 1)
+        self._country_pos = {c: i for i, c in enumerate(self.countries)}
+        self._type_pos = {t: i for i, t in enumerate(self.types)}
+
+        c_idx = pd.Index(self.countries).get_indexer(data["Country"])
+        t_idx = pd.Index(self.types).get_indexer(data["Pesticide_Type"])
+        y_idx = data["Year"].to_numpy(dtype=int) - self.years[0]
+
+        # Tonnes: one series per (Country, Pesticide_Type)
+        self.tonnes = np.full((len(self.countries), len(self.types), len(self.years)), np.nan)
+        self.tonnes[c_idx, t_idx, y_idx] = data["Tonnes"].to_numpy(dtype=float)
+
+        # Kg_per_ha is a country-year value, repeated for every type in the CSV
+        self.kg_per_ha = np.full((len(self.countries), len(self.years)), np.nan)
+        self.kg_per_ha[c_idx, y_idx] = data["Kg_per_ha"].to_numpy(dtype=float)
+
+        self.tonnes_yoy = _pct_change(self.tonnes)
+        self.kg_per_ha_yoy = _pct_change(self.kg_per_ha)
+        self.tonnes_rolling_mean = _rolling_stats(self.tonnes, window)[0]
+        self.kg_per_ha_rolling_mean = _rolling_stats(self.kg_per_ha, window)[0]
+        self.tonnes_rolling_z = _rolling_zscore(self.tonnes, window)
+        self.kg_per_ha_rolling_z = _rolling_zscore(self.kg_per_ha, window)
+
+        # (method, countries, years) -> baseline frame; switching the focus country reuses these
+        self._baselines = OrderedDict()
+        self._baselines_lock = threading.Lock()
+
+        for arr in (self.tonnes, self.kg_per_ha, self.tonnes_yoy, self.kg_per_ha_yoy,
+                    self.tonnes_rolling_mean, self.kg_per_ha_rolling_mean,
+                    self.tonnes_rolling_z, self.kg_per_ha_rolling_z):
+            arr.flags.writeable = False
+
+    def year_slice(self, year_range):
+        """Slice of the year axis covering an inclusive (start, end) range"""
+        start = max(int(year_range[0]) - int(self.years[0]), 0)
+        end = min(int(year_range[1]) - int(self.years[0]), len(self.years) - 1)
+        return slice(start, end + 1)
+
+    def country_index(self, country):
+        return self._country_pos.get(country)
+
+    def type_index(self, pesticide_type):
+        return self._type_pos.get(pesticide_type)
+
+    def country_indices(self, countries):
+        """Row positions for a list of countries (unknown names are skipped)"""
+        idx = [self._country_pos[c] for c in countries if c in self._country_pos]
+        return np.array(sorted(idx), dtype=int)
+
+    def _cached_baseline(self, key, build):
+        """A baseline from the per-store cache, built on first use (callers must not modify it)"""
+        with self._baselines_lock:
+            if key in self._baselines:
+                self._baselines.move_to_end(key)
+                return self._baselines[key]
+        value = build()
+        with self._baselines_lock:
+            self._baselines[key] = value
+            while len(self._baselines) > MAX_BASELINES:
+                self._baselines.popitem(last=False)
+        return value
+
+    def regional_mean(self, countries, year_range):
+        """Mean Kg_per_ha per year across the given countries, cached per filter state"""
+        key = ("regional", tuple(countries), (int(year_range[0]), int(year_range[1])))
+        return self._cached_baseline(key, lambda: self._regional_mean(countries, year_range))
+
+    def _regional_mean(self, countries, year_range):
+        idx = self.country_indices(countries)
+        s = self.year_slice(year_range)
+        with np.errstate(invalid="ignore"):
+            values = np.nanmean(self.kg_per_ha[idx, s], axis=0) if len(idx) else np.full(s.stop - s.start, np.nan)
+        return pd.DataFrame({"Year": self.years[s], "Kg_per_ha": values}).dropna()
+
+    def recent_mean(self, countries, end_year, n_years=DEFAULT_WINDOW):
+        """Mean Kg_per_ha per country over the last n_years up to end_year, cached per filter state"""
+        key = ("recent", tuple(countries), (int(end_year), int(n_years)))
+        return self._cached_baseline(key, lambda: self._recent_mean(countries, end_year, n_years))
+
+    def _recent_mean(self, countries, end_year, n_years):
+        idx = self.country_indices(countries)
+        s = self.year_slice((end_year - n_years + 1, end_year))
+        with np.errstate(invalid="ignore"):
+            values = np.nanmean(self.kg_per_ha[idx, s], axis=1)
+        return pd.Series(values, index=self.countries[idx], name="Kg_per_ha").dropna()
+
+    def kg_per_ha_cagr(self, year_range):
+        """CAGR of Kg_per_ha for every country over the given year range"""
+        s = self.year_slice(year_range)
+        return _cagr(self.kg_per_ha, s.start, s.stop - 1)
+
+    def tonnes_cagr(self, year_range):
+        """CAGR of Tonnes for every (country, type) over the given year range"""
+        s = self.year_slice(year_range)
+        return _cagr(self.tonnes, s.start, s.stop - 1)
+
+    def country_frame(self, country, year_range):
+        """Kg_per_ha metrics for one country as a small DataFrame"""
+        i = self.country_index(country)
+        s = self.year_slice(year_range)
+        if i is None:
+            return pd.DataFrame(columns=["Year", "Kg_per_ha", "YoY_Change", "Rolling_Mean", "Rolling_Z"])
+        return pd.DataFrame({
+            "Year": self.years[s],
+            "Kg_per_ha": self.kg_per_ha[i, s],
+            "YoY_Change": self.kg_per_ha_yoy[i, s],
+            "Rolling_Mean": self.kg_per_ha_rolling_mean[i, s],
+            "Rolling_Z": self.kg_per_ha_rolling_z[i, s],
+        })
@@ -0,0 +1,320 @@
+"""Linear, log-linear and piecewise trend fits for every series at once.
+
+Every (Country, Pesticide_Type) tonnage series and every country's Kg_per_ha
+series are stacked into one matrix. Each model is then fitted to all rows
+together with masked least squares: one batched solve of the normal
+equations, with missing years getting zero weight. The piecewise model tries
+each candidate breakpoint in turn, which is a loop over breakpoints, never
+over series. Residual volatility, shock persistence and projections come
+from the same arrays.
+"""
+import threading
+
+import numpy as np
+import pandas as pd
+
+KG_PER_HA = "Kg_per_ha"
+
+MODELS = ["linear", "log_linear", "piecewise"]
+
+# Piecewise fits need this many years on each side of the break
+MIN_SEGMENT = 4
+
+# Years projected past the last observed year
+DEFAULT_HORIZON = 3
+
+# Intercept, slope, slope change and the searched breakpoint, which AIC must count too
+PIECEWISE_PARAMS = 4
+
+# year range -> TrendFits kept per DatasetVersion for ranges other than the full one
+MAX_RANGE_FITS = 32
+
+
+def _batched_lstsq(X, Y, W):
+    """Weighted least squares of every row of Y on the shared design X.
+
+    X is (years, params); Y and W are (series, years), with W zero where a
+    year is missing. Returns coefficients (series, params), the pseudo-inverse
+    of X'WX (series, params, params) and the number of points per series.
+    """
+    Y = np.where(W > 0, Y, 0.0)
+    xtwx = np.einsum("ti,st,tj->sij", X, W, X)
+    xtwy = np.einsum("ti,st->si", X, W * Y)
+    inv = np.linalg.pinv(xtwx)
+    coef = np.einsum("sij,sj->si", inv, xtwy)
+    return coef, inv, W.sum(axis=1)
+
+
+def _sse(X, coef, Y, W):
+    resid = np.where(W > 0, Y - coef @ X.T, 0.0)
+    return (resid ** 2).sum(axis=1)
+
+
+def _fit(X, Y, W, transform=None):
+    """Fit one design; residuals and fitted values are in the original units"""
+    target = Y if transform is None else transform(Y)
+    coef, inv, n = _batched_lstsq(X, target, W)
+    fitted = coef @ X.T
+    if transform is not None:
+        fitted = np.exp(fitted)
+    resid = np.where(W > 0, Y - fitted, np.nan)
+    # Residuals in the space the model was fitted in (log space for log-linear), for prediction bands
+    model_resid = resid if transform is None else np.where(W > 0, target - coef @ X.T, np.nan)
+    return {"coef": coef, "inv": inv, "n": n, "fitted": fitted, "resid": resid, "model_resid": model_resid,
+            "params": X.shape[1]}
+
+
+def _hinge(t, knot):
+    return np.column_stack([np.ones_like(t), t, np.maximum(t - knot, 0.0)])
+
+
+class TrendFits:
+    """Trend models for every series of a TimeSeriesStore over one year range"""
+
+    def __init__(self, store, year_range=None):
+        s = store.year_slice(year_range or (store.years[0], store.years[-1]))
+        self.years = store.years[s]
+        n_countries, n_types = len(store.countries), len(store.types)
+
+        # Rows: every (country, type) tonnage series, then every country's Kg_per_ha
+        self.keys = pd.DataFrame({
+            "Country": np.concatenate([np.repeat(store.countries, n_types), store.countries]),
+            "Series": np.concatenate([np.tile(store.types, n_countries), np.full(n_countries, KG_PER_HA)]),
+        })
+        self._row = {(c, t): i for i, (c, t) in enumerate(zip(self.keys["Country"], self.keys["Series"]))}
+        self.values = np.vstack([store.tonnes[:, :, s].reshape(-1, len(self.years)), store.kg_per_ha[:, s]])
+
+        observed = ~np.isnan(self.values)
+        weight = observed.astype(float)
+        t = (self.years - self.years[0]).astype(float)
+        linear_X = np.column_stack([np.ones_like(t), t])
+
+        self.fits = {
+            "linear": _fit(linear_X, self.values, weight),
+            # Log-linear only sees positive years (log of zero tonnes is undefined)
+            "log_linear": _fit(linear_X, self.values, weight * (np.nan_to_num(self.values) > 0),
+                               transform=lambda y: np.log(np.where(y > 0, y, 1.0))),
+            "piecewise": self._fit_piecewise(t, weight),
+        }
+        self.observed = observed
+        self.best = self._select_best()
+        self.metrics = self._metrics()
+
+    def _fit_piecewise(self, t, weight):
+        """Continuous hinge y = a + b*t + c*max(t - k, 0), with k chosen per series by least SSE"""
+        knots = t[MIN_SEGMENT - 1:len(t) - MIN_SEGMENT]
+        if len(knots) == 0:
+            # Too few years for a break: the hinge never activates and AIC prefers the linear fit
+            return _fit(_hinge(t, t[-1]), self.values, weight) | {"knot": np.full(len(self.values), t[-1]),
+                                                                  "params": PIECEWISE_PARAMS}
+        sse = np.empty((len(self.values), len(knots)))
+        for j, knot in enumerate(knots):
+            X = _hinge(t, knot)
+            coef, _, _ = _batched_lstsq(X, self.values, weight)
+            sse[:, j] = _sse(X, coef, self.values, weight)
+        best = sse.argmin(axis=1)
+
+        fit = {"coef": np.empty((len(self.values), 3)), "inv": np.empty((len(self.values), 3, 3)),
+               "n": weight.sum(axis=1), "fitted": np.empty_like(self.values), "params": PIECEWISE_PARAMS}
+        # Refit grouped by chosen knot: at most one solve per distinct knot
+        for j in np.unique(best):
+            rows = best == j
+            X = _hinge(t, knots[j])
+            coef, inv, _ = _batched_lstsq(X, self.values[rows], weight[rows])
+            fit["coef"][rows], fit["inv"][rows], fit["fitted"][rows] = coef, inv, coef @ X.T
+        fit["resid"] = fit["model_resid"] = np.where(weight > 0, self.values - fit["fitted"], np.nan)
+        fit["knot"] = knots[best]
+        return fit
+
+    def _aic(self, model):
+        fit = self.fits[model]
+        n = fit["n"]
+        sse = np.nansum(fit["resid"] ** 2, axis=1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            aic = n * np.log(sse / n) + 2 * fit["params"]
+        # Too few points for the model, or a perfect fit of a flat series
+        aic[(n <= fit["params"] + 1) | ~np.isfinite(aic)] = np.inf
+        return aic
+
+    def _select_best(self):
+        """Per series, the model with the lowest AIC on original-unit residuals"""
+        aic = np.column_stack([self._aic(m) for m in MODELS])
+        best = np.array(MODELS, dtype=object)[aic.argmin(axis=1)]
+        best[~np.isfinite(aic).any(axis=1)] = "linear"
+        return best
+
+    def _metrics(self):
+        """One row per series: growth, break point, fit quality and residual volatility"""
+        lin, log, pw = self.fits["linear"], self.fits["log_linear"], self.fits["piecewise"]
+        model_idx = np.array([MODELS.index(m) for m in self.best], dtype=int)
+        best_resid = np.stack([self.fits[m]["resid"] for m in MODELS])[model_idx, np.arange(len(model_idx))]
+        observed_values = np.where(self.observed, self.values, 0.0)
+        n = self.observed.sum(axis=1)
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean_level = observed_values.sum(axis=1) / n
+            total_ss = (np.where(self.observed, self.values - mean_level[:, None], 0.0) ** 2).sum(axis=1)
+            resid = np.nan_to_num(best_resid)
+            resid_ss = (resid ** 2).sum(axis=1)
+            volatility = 100 * np.sqrt(resid_ss / (n - 1)) / mean_level
+            # Lag-1 autocorrelation of the residuals: near 0, shocks fade; near 1, they persist
+            persistence = (resid[:, :-1] * resid[:, 1:]).sum(axis=1) / resid_ss
+            r2 = {m: 1 - np.nansum(self.fits[m]["resid"] ** 2, axis=1) / total_ss for m in MODELS}
+
+        # Coefficients of under-determined fits are meaningless
+        growth = np.where(log["n"] > 2, 100 * np.expm1(log["coef"][:, 1]), np.nan)
+        slope = np.where(lin["n"] > 2, lin["coef"][:, 1], np.nan)
+        has_break = pw["n"] >= 2 * MIN_SEGMENT
+        for m in MODELS:
+            r2[m][self.fits[m]["n"] <= self.fits[m]["params"]] = np.nan
+        volatility[n < 3] = np.nan
+        persistence[n < 3] = np.nan
+
+        first = np.argmax(self.observed, axis=1)
+        last = len(self.years) - 1 - np.argmax(self.observed[:, ::-1], axis=1)
+        rows = np.arange(len(self.values))
+        metrics = self.keys.assign(
+            First_Year=self.years[first],
+            First_Value=self.values[rows, first],
+            Last_Year=self.years[last],
+            Last_Value=self.values[rows, last],
+            Linear_Slope=slope,
+            Growth_Pct_per_Year=growth,
+            Break_Year=np.where(has_break, self.years[0] + pw["knot"], np.nan),
+            Slope_Before_Break=np.where(has_break, pw["coef"][:, 1], np.nan),
+            Slope_After_Break=np.where(has_break, pw["coef"][:, 1] + pw["coef"][:, 2], np.nan),
+            R2_Linear=r2["linear"],
+            R2_Log_Linear=r2["log_linear"],
+            R2_Piecewise=r2["piecewise"],
+            Best_Model=self.best,
+            Volatility_Pct=volatility,
+            Shock_Persistence=persistence,
+        )
+        return metrics[self.observed.any(axis=1)].reset_index(drop=True)
+
+    def series_index(self, country, series=KG_PER_HA):
+        return self._row.get((country, series))
+
+    def trend_line(self, country, series=KG_PER_HA):
+        """Fitted values of the series' best model over the fitted years"""
+        i = self.series_index(country, series)
+        if i is None:
+            return pd.DataFrame(columns=["Year", "Trend", "Model"])
+        return pd.DataFrame({"Year": self.years, "Trend": self.fits[self.best[i]]["fitted"][i], "Model": self.best[i]})
+
+    def project(self, country, series=KG_PER_HA, horizon=DEFAULT_HORIZON, model=None, z=1.64):
+        """Best-model projection for one series with an approximate 90% prediction band"""
+        i = self.series_index(country, series)
+        if i is None or not self.observed[i].any():
+            return pd.DataFrame(columns=["Year", "Projection", "Lower", "Upper", "Model"])
+        model = model or self.best[i]
+        fit = self.fits[model]
+        future = np.arange(self.years[-1] + 1, self.years[-1] + 1 + horizon)
+        t = (future - self.years[0]).astype(float)
+        X = _hinge(t, self.fits["piecewise"]["knot"][i]) if model == "piecewise" else np.column_stack([np.ones_like(t), t])
+        n, p = fit["n"][i], fit["params"]
+        if n <= p:
+            # No residual degrees of freedom: the band would be undefined or zero-width
+            return pd.DataFrame(columns=["Year", "Projection", "Lower", "Upper", "Model"])
+        with np.errstate(invalid="ignore", divide="ignore"):
+            # For log-linear the band is built in log space and mapped back through exp
+            sigma = np.sqrt(np.nansum(fit["model_resid"][i] ** 2) / (n - p))
+            spread = z * sigma * np.sqrt(1 + np.einsum("ti,ij,tj->t", X, fit["inv"][i], X))
+        center = X @ fit["coef"][i]
+        if model == "log_linear":
+            projection, lower, upper = np.exp(center), np.exp(center - spread), np.exp(center + spread)
+        else:
+            projection, lower, upper = center, np.maximum(center - spread, 0.0), center + spread
+        return pd.DataFrame({"Year": future, "Projection": projection, "Lower": lower, "Upper": upper, "Model": model})
+
+
+_range_fits_lock = threading.Lock()
+
+
+def fits_for(dataset, year_range):
+    """Fits for a dataset version and year range; the version's own fits cover the full range.
+
+    Other ranges are cached on the version itself (``dataset.range_fits``), so
+    they are released together with the version after a refresh.
+    """
+    years = dataset.store.years
+    year_range = (max(int(year_range[0]), int(years[0])), min(int(year_range[1]), int(years[-1])))
+    if year_range == (int(years[0]), int(years[-1])):
+        return dataset.trends
+    cache = dataset.range_fits
+    with _range_fits_lock:
+        if year_range in cache:
+            cache.move_to_end(year_range)
+            return cache[year_range]
+    fits = TrendFits(dataset.store, year_range)
+    with _range_fits_lock:
+        cache[year_range] = fits
+        while len(cache) > MAX_RANGE_FITS:
+            cache.popitem(last=False)
+    return fits
+
+
+def _volatility_label(pct):
+    if not np.isfinite(pct):
+        return None
+    return "low" if pct < 5 else "moderate" if pct < 15 else "high"
+
+
+def insights(fits, focus_country, recent_avg):
+    """Markdown bullet points describing the focus country's Kg_per_ha trend"""
+    metrics = fits.metrics
+    row = metrics[(metrics["Country"] == focus_country) & (metrics["Series"] == KG_PER_HA)]
+    if row.empty:
+        return [f"No Kg_per_ha data for {focus_country} in the selected years."]
+    m = row.iloc[0]
+    bullets = []
+
+    if m["First_Year"] == m["Last_Year"]:
+        return [f"{focus_country} used **{m['Last_Value']:.2f}** kg/ha in {m['Last_Year']}; "
+                "select a longer year range to fit a trend."]
+    ratio = m["Last_Value"] / m["First_Value"] if m["First_Value"] > 0 else np.nan
+    change = f" (**×{ratio:.1f}**)" if np.isfinite(ratio) else ""
+    growth = (f", a fitted trend of **{m['Growth_Pct_per_Year']:+.1f}% per year**"
+              if np.isfinite(m["Growth_Pct_per_Year"]) else "")
+    bullets.append(
+        f"Intensity went from **{m['First_Value']:.2f}** kg/ha in {m['First_Year']} to "
+        f"**{m['Last_Value']:.2f}** kg/ha in {m['Last_Year']}{change}{growth}."
+    )
+
+    if m["Best_Model"] == "piecewise" and np.isfinite(m["Break_Year"]):
+        bullets.append(
+            f"The trend bends around **{int(m['Break_Year'])}**: {m['Slope_Before_Break']:+.3f} kg/ha per year "
+            f"before, {m['Slope_After_Break']:+.3f} after."
+        )
+    elif m["Best_Model"] == "log_linear" and np.isfinite(m["R2_Log_Linear"]):
+        bullets.append(f"A steady exponential trend fits best (R² {m['R2_Log_Linear']:.2f}).")
+    elif np.isfinite(m["R2_Linear"]):
+        bullets.append(f"A straight-line trend fits best (R² {m['R2_Linear']:.2f}).")
+
+    label = _volatility_label(m["Volatility_Pct"])
+    if label:
+        persistence = m["Shock_Persistence"]
+        recovery = (
+            "deviations from trend fade within a year or two" if persistence < 0.3
+            else "deviations from trend persist for several years" if persistence > 0.6
+            else "deviations from trend fade over a few years"
+        )
+        bullets.append(
+            f"Year-to-year swings are **{label}** (±{m['Volatility_Pct']:.0f}% around the trend) and {recovery}."
+        )
+
+    leaders = recent_avg.sort_values(ascending=False)
+    if focus_country in leaders.index and len(leaders) > 1:
+        rank = list(leaders.index).index(focus_country) + 1
+        above = list(leaders.index[:rank - 1])
+        standing = f"ranks **#{rank} of {len(leaders)}**" + (f", behind {', '.join(above)}" if above else "")
+        bullets.append(f"Over the last 5 years {focus_country} {standing} among the selected countries.")
+
+    projection = fits.project(focus_country)
+    if not projection.empty and np.isfinite(projection[["Lower", "Upper"]].to_numpy()).all():
+        p = projection.iloc[-1]
+        bullets.append(
+            f"If the trend holds, about **{p['Projection']:.2f}** kg/ha by {int(p['Year'])} "
+            f"(range {p['Lower']:.2f}–{p['Upper']:.2f})."
+        )
+    return bullets
@@ -0,0 +1,312 @@
+"""Data-quality checks for the cleaned dataset.
+
+Every check is vectorized over dense (country, year) partition codes, with
+no groupby or merge. Problems are reported per partition, so one bad
+country-year is flagged while the rest of the data loads and serves as
+usual. Reports are cached by a hash of the dataset contents, in memory and
+on disk, so reloading unchanged data skips the checks.
+
+Run from the Dashboard directory to check a file before dropping it in:
+
+    python validate.py path/to/Pesticide_Cleaned_Data_v3.csv
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from dataset import find_data_file, load_source
+from queries import TOTAL_TYPE, to_records
+
+# Bump when a check changes so cached reports from older checks are ignored
+CHECKS_VERSION = 2
+
+# Columns that place a row; rows missing any of them are flagged and dropped at load
+KEY_COLUMNS = ["Country", "Pesticide_Type", "Year"]
+
+# Check name -> what it asserts
+CHECKS = {
+    "missing_values": "No NaN in any column",
+    "negative_values": "Tonnes and Kg_per_ha are not negative",
+    "total_matches_types": f'"{TOTAL_TYPE}" equals the sum of the other types per (Country, Year)',
+    "single_kg_per_ha": "One Kg_per_ha value per (Country, Year)",
+    "year_coverage": "Every country has every year of the dataset's range",
+}
+
+# Totals are rounded separately from the per-type values
+TOTAL_TOLERANCE_TONNES = 1.0
+# Kg_per_ha repeats per type and carries float noise from the notebook's merge
+KG_PER_HA_TOLERANCE = 1e-9
+
+
+def user_cache_dir():
+    """Per-user cache location: %LOCALAPPDATA%, ~/Library/Caches or $XDG_CACHE_HOME (~/.cache)"""
+    if sys.platform == "win32":
+        base = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~")
+    elif sys.platform == "darwin":
+        base = os.path.expanduser("~/Library/Caches")
+    else:
+        base = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    return os.path.join(base, "pesticide-dashboard", "validation")
+
+
+# Outside the source tree, so checking out or deploying the code never picks up stale reports
+CACHE_DIR = os.environ.get("PESTICIDE_VALIDATION_CACHE") or user_cache_dir()
+
+ISSUE_COLUMNS = ["Check", "Country", "Year", "Detail"]
+
+# Reports kept in memory: the current dataset plus a few recent ones
+MAX_REPORTS = 4
+
+
+def dataset_hash(df):
+    """Content hash of a DataFrame: column names, dtypes and every value"""
+    digest = hashlib.sha1(repr([(c, str(t)) for c, t in df.dtypes.items()]).encode())
+    digest.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+class ValidationReport:
+    """Result of the checks for one dataset: the issues plus per-check counts"""
+
+    def __init__(self, digest, issues):
+        self.dataset_hash = digest
+        self.issues = _issue_frame(issues)
+        self.counts = {name: int((self.issues["Check"] == name).sum()) for name in CHECKS}
+
+    @property
+    def ok(self):
+        return self.issues.empty
+
+    @property
+    def bad_partitions(self):
+        """Distinct (Country, Year) pairs with at least one issue"""
+        return self.issues[["Country", "Year"]].drop_duplicates().sort_values(["Country", "Year"]).reset_index(drop=True)
+
+    def for_selection(self, countries, year_range):
+        """Issues inside a filter state, plus rows dropped for lacking a Country or Year"""
+        issues = self.issues
+        unplaced = (issues["Country"].isna() | issues["Year"].isna()).to_numpy()
+        inside = (issues["Country"].isin(countries) & issues["Year"].between(*year_range)).fillna(False).to_numpy(dtype=bool)
+        return issues[unplaced | inside]
+
+    def to_dict(self):
+        return {
+            "checks_version": CHECKS_VERSION,
+            "dataset_hash": self.dataset_hash,
+            "counts": self.counts,
+            "issues": to_records(self.issues),
+        }
+
+    @classmethod
+    def from_dict(cls, d):
+        return cls(d["dataset_hash"], pd.DataFrame(d["issues"], columns=ISSUE_COLUMNS))
+
+
+def _issue_frame(issues):
+    """Issues with a nullable Year: rows without a Country or Year still get reported"""
+    issues = pd.DataFrame(issues, columns=ISSUE_COLUMNS).astype({"Country": object, "Year": "Int64"})
+    issues["Country"] = issues["Country"].where(issues["Country"].notna(), None)
+    return issues
+
+
+def keyed_rows(df):
+    """Mask of rows that have every KEY_COLUMNS value"""
+    return df[KEY_COLUMNS].notna().all(axis=1).to_numpy()
+
+
+def drop_unkeyed(df):
+    """The rows that can be placed in a (country, type, year) partition; the others are reported by check_frame"""
+    keyed = keyed_rows(df)
+    if keyed.all():
+        return df
+    kept = df[keyed].reset_index(drop=True)
+    kept["Year"] = pd.to_numeric(kept["Year"], downcast="integer")
+    for col in ("Country", "Pesticide_Type"):
+        if isinstance(kept[col].dtype, pd.CategoricalDtype):
+            kept[col] = kept[col].cat.remove_unused_categories()
+    kept.attrs = df.attrs
+    return kept
+
+
+def _partitions(df):
+    """Dense (country, year) code per row plus the country labels and year axis; every key must be present"""
+    country = df["Country"].astype("category")
+    countries = np.asarray(country.cat.categories)
+    years = df["Year"].to_numpy(dtype=np.int64)
+    year_min = int(years.min()) if len(years) else 0
+    year_axis = np.arange(year_min, (int(years.max()) if len(years) else -1) + 1)
+    codes = country.cat.codes.to_numpy(dtype=np.int64) * len(year_axis) + (years - year_min)
+    return codes, countries, year_axis
+
+
+def _unkeyed_issues(df):
+    """One missing_values issue per row without a key: it cannot be placed, so it is dropped at load"""
+    rows = df[~keyed_rows(df)]
+    missing = rows[KEY_COLUMNS].isna().to_numpy()
+    detail = [", ".join(c for c, m in zip(KEY_COLUMNS, row) if m) + " missing; row dropped" for row in missing]
+    return pd.DataFrame({
+        "Check": "missing_values",
+        "Country": rows["Country"].to_numpy(dtype=object),
+        "Year": pd.array(rows["Year"].to_numpy(dtype=float), dtype="Int64"),
+        "Detail": detail,
+    }, columns=ISSUE_COLUMNS)
+
+
+def _issues(check, countries, year_axis, flat, detail):
+    """Issue rows for flat partition codes; ``detail`` is one string per code"""
+    country, year = np.divmod(flat, len(year_axis))
+    return pd.DataFrame({
+        "Check": check,
+        "Country": countries[country].astype(str),
+        "Year": year_axis[year].astype(int),
+        "Detail": detail,
+    }, columns=ISSUE_COLUMNS)
+
+
+def check_frame(df):
+    """Run every check over the cleaned dataset; a DataFrame of ISSUE_COLUMNS, empty when clean"""
+    if df.empty:
+        return _issue_frame(None)
+    frames = []
+    keyed = keyed_rows(df)
+    if not keyed.all():
+        frames.append(_unkeyed_issues(df))
+        df = df[keyed]
+        if df.empty:
+            return _issue_frame(frames[0])
+    codes, countries, year_axis = _partitions(df)
+    n = len(countries) * len(year_axis)
+    tonnes = df["Tonnes"].to_numpy(dtype=float)
+    kg_per_ha = df["Kg_per_ha"].to_numpy(dtype=float)
+
+    # NaNs and negatives, reported per partition with the offending columns
+    for check, bad_by_column in [
+        ("missing_values", {col: df[col].isna().to_numpy() for col in df.columns}),
+        ("negative_values", {"Tonnes": tonnes < 0, "Kg_per_ha": kg_per_ha < 0}),
+    ]:
+        hits = {col: np.bincount(codes[bad], minlength=n) for col, bad in bad_by_column.items() if bad.any()}
+        if hits:
+            flat = np.flatnonzero(sum(hits.values()))
+            detail = [", ".join(f"{col} x{hit[i]}" for col, hit in hits.items() if hit[i]) for i in flat]
+            frames.append(_issues(check, countries, year_axis, flat, detail))
+
+    present = np.bincount(codes, minlength=n) > 0
+
+    # Total row against the sum of the per-type rows
+    is_total = (df["Pesticide_Type"] == TOTAL_TYPE).to_numpy()
+    total_rows = np.bincount(codes[is_total], minlength=n)
+    total = np.bincount(codes[is_total], weights=tonnes[is_total], minlength=n)
+    type_sum = np.bincount(codes[~is_total], weights=tonnes[~is_total], minlength=n)
+    with np.errstate(invalid="ignore"):
+        mismatch = present & ((total_rows != 1) | ~(np.abs(total - type_sum) <= TOTAL_TOLERANCE_TONNES))
+    flat = np.flatnonzero(mismatch)
+    if len(flat):
+        detail = [
+            f"{total_rows[i]} total rows" if total_rows[i] != 1 else f"total {total[i]:g} vs sum of types {type_sum[i]:g}"
+            for i in flat
+        ]
+        frames.append(_issues("total_matches_types", countries, year_axis, flat, detail))
+
+    # Kg_per_ha spread within each partition (NaNs are already reported above)
+    valid = ~np.isnan(kg_per_ha)
+    low = np.full(n, np.inf)
+    high = np.full(n, -np.inf)
+    np.minimum.at(low, codes[valid], kg_per_ha[valid])
+    np.maximum.at(high, codes[valid], kg_per_ha[valid])
+    flat = np.flatnonzero(present & (high - low > KG_PER_HA_TOLERANCE))
+    if len(flat):
+        detail = [f"Kg_per_ha ranges {low[i]:g} to {high[i]:g}" for i in flat]
+        frames.append(_issues("single_kg_per_ha", countries, year_axis, flat, detail))
+
+    # Years missing for a country within the dataset's overall range
+    missing = present.reshape(len(countries), len(year_axis))
+    missing = ~missing & missing.any(axis=1, keepdims=True)
+    flat = np.flatnonzero(missing)
+    if len(flat):
+        frames.append(_issues("year_coverage", countries, year_axis, flat, "no rows for this year"))
+
+    if not frames:
+        return _issue_frame(None)
+    return _issue_frame(pd.concat([_issue_frame(f) for f in frames], ignore_index=True))
+
+
+# dataset hash -> ValidationReport, shared by every DatasetVersion in the process (LRU)
+_reports = OrderedDict()
+_reports_lock = threading.Lock()
+
+
+def _cache_path(digest):
+    return os.path.join(CACHE_DIR, f"v{CHECKS_VERSION}-{digest}.json")
+
+
+def _read_cached(digest):
+    try:
+        with open(_cache_path(digest)) as f:
+            d = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if d.get("checks_version") != CHECKS_VERSION or d.get("dataset_hash") != digest:
+        return None
+    return ValidationReport.from_dict(d)
+
+
+def _write_cached(report):
+    """Best effort: a read-only deployment just revalidates on its next start"""
+    path = _cache_path(report.dataset_hash)
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(report.to_dict(), f)
+        os.replace(tmp, path)
+    except OSError:
+        pass
+
+
+def validate(df):
+    """ValidationReport for a dataset, reused from the cache when its contents were checked before"""
+    digest = dataset_hash(df)
+    with _reports_lock:
+        report = _reports.get(digest)
+    if report is None:
+        report = _read_cached(digest)
+        if report is None:
+            report = ValidationReport(digest, check_frame(df))
+            _write_cached(report)
+        with _reports_lock:
+            _reports[digest] = report
+    with _reports_lock:
+        _reports.move_to_end(digest)
+        while len(_reports) > MAX_REPORTS:
+            _reports.popitem(last=False)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the cleaned pesticide dataset's invariants")
+    parser.add_argument("source", nargs="?", help="CSV, SQLite or pickle (default: the dashboard's data file)")
+    args = parser.parse_args()
+    source = args.source or find_data_file()
+    if source is None:
+        raise SystemExit("No data file found; pass one explicitly")
+
+    df = load_source(source)
+    report = ValidationReport(dataset_hash(df), check_frame(df))
+    for name, description in CHECKS.items():
+        status = "ok" if not report.counts[name] else f"{report.counts[name]} flagged"
+        print(f"{name:<22} {status:<12} {description}")
+    if not report.ok:
+        print()
+        print(report.issues.to_string(index=False))
+    sys.exit(0 if report.ok else 1)
+
+
+if __name__ == "__main__":
+    main()